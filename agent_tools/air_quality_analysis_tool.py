@@ -12,12 +12,24 @@ using a combination of OpenAQ API, AWS S3 OpenAQ data archive, and an
 internal BoundingBoxExtractorTool for geographical lookup.
 """
 
-from typing import Optional, List, Type
-from datetime import datetime, date
-import requests
+from typing import Optional, List, Tuple, Type, Union
+from datetime import datetime, date, timedelta
+from pathlib import Path
 import pandas as pd
-import gzip
+import pyarrow as pa
+from pyarrow import csv as pacsv
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+try:
+    from isal import igzip  # ISA-L backed, much faster inflate than the stdlib
+except ImportError:
+    import gzip as igzip
 import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cachetools import TTLCache, cached
 
 from crewai.tools import BaseTool
 import boto3
@@ -25,13 +37,147 @@ from botocore import UNSIGNED
 from botocore.config import Config
 from .bounding_box_extractor_tool import BoundingBoxExtractorTool # Relative import if in same package
 # Import the get_openaq_api_key function from your utils file
-from .utils import get_openaq_api_key
+from .utils import get_openaq_api_key, get_http_session, OPENAQ_SEMAPHORE
 from typing import List, Optional
 anonymous_session = boto3.Session()  # For public bucket
+_SESSION = get_http_session()  # Shared with the other tools
+S3_MAX_WORKERS = 32  # Concurrent S3 downloads; the work is I/O bound
+S3_MAX_POOL_CONNECTIONS = 64  # Keep the urllib3 pool larger than S3_MAX_WORKERS
+BBOX_MAX_WORKERS = 8  # Bounding boxes processed concurrently, all feeding the shared S3 pool below
+# One long-lived download pool for the whole process: every (location, day) request from every
+# bounding box is fanned out through it, keeping total in-flight S3 requests bounded
+_S3_EXECUTOR = ThreadPoolExecutor(max_workers=S3_MAX_WORKERS, thread_name_prefix="openaq-s3")
+# Built once at import (loading service models is slow) and shared by every download thread
+_S3_CLIENT = anonymous_session.client(
+    's3', region_name="us-east-1",
+    config=Config(signature_version=UNSIGNED, max_pool_connections=S3_MAX_POOL_CONNECTIONS, retries={'max_attempts': 5, 'mode': 'adaptive'}),
+)
+OPENAQ_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"  # ISO 8601 with the station's UTC offset
+
+# Only the columns used by the aggregation are parsed. 'datetime' stays a string so that
+# pandas keeps each reading's local UTC offset (Arrow would normalise it to UTC and shift days).
+CSV_READ_OPTIONS = pacsv.ReadOptions(use_threads=True)
+CSV_CONVERT_OPTIONS = pacsv.ConvertOptions(
+    include_columns=["datetime", "parameter", "value", "units"],
+    column_types={"datetime": pa.string()},
+)
+
+# Per (location, parameter, day) statistics handed to the analyst instead of raw readings;
+# 'value' stays the daily mean
+DAILY_VALUE_COLUMNS = ["value", "value_min", "value_max", "value_p95"]
+
+
+# Parsed daily files are kept on disk as Parquet so reruns skip both the S3 round trip and the
+# decompress + CSV parse. Only days old enough to be final are cached, since the archive may
+# still be back-filled for the most recent days.
+OPENAQ_CACHE_DIR = Path(os.getenv("OPENAQ_CACHE_DIR", "~/.cache/openaq")).expanduser()
+OPENAQ_CACHE_MIN_AGE_DAYS = 3
+
+
+def _daily_cache_path(location_id: int, year: str, month: str, day: str) -> Path:
+    return OPENAQ_CACHE_DIR / f"loc={location_id}" / f"date={year}{month}{day}.parquet"
+
+
+def _is_cacheable_day(year: str, month: str, day: str) -> bool:
+    return date(int(year), int(month), int(day)) <= date.today() - timedelta(days=OPENAQ_CACHE_MIN_AGE_DAYS)
+
+
+def _read_cached_day(path: Path) -> Optional[pa.Table]:
+    if not path.exists():
+        return None
+    try:
+        return pq.read_table(path)
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"Ignoring unreadable cache file {path}: {e}")
+        return None
+
+
+def _write_cached_day(path: Path, table: pa.Table) -> None:
+    # Write to a per-thread temp file and rename into place, so concurrent workers never see a partial file
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write cache file {path}: {e}")
+
+
+# Aggregated per-bbox results are content-addressed on the query itself, so an identical
+# (bbox, date range, parameters) request skips the OpenAQ lookups and all S3 traffic
+def _result_cache_path(bbox: List[float], start_date: str, end_date: str, parameters: Optional[List[str]]) -> Path:
+    # The output columns are part of the key so results cached with an older layout are not reused
+    query = json.dumps([[float(c) for c in bbox], start_date, end_date, sorted(parameters or []), DAILY_VALUE_COLUMNS])
+    return OPENAQ_CACHE_DIR / "results" / f"{hashlib.sha1(query.encode()).hexdigest()}.parquet"
+
+
+def _tables_to_pandas(tables: List[pa.Table]) -> pd.DataFrame:
+    # Concatenate the daily Arrow tables (a cheap chunk concatenation, widening types that were
+    # inferred differently per file) and convert once; Arrow-backed columns make the conversion
+    # near zero-copy, and self_destruct frees each Arrow column as soon as it has been converted
+    if not tables:
+        return pd.DataFrame()
+    combined = pa.concat_tables(tables, promote_options="permissive")
+    return combined.to_pandas(types_mapper=pd.ArrowDtype, self_destruct=True)
+
+
+# Step 2: Fetch location IDs from OpenAQ. Cached for 30 minutes, keyed on the bbox rounded to ~10 m.
+@cached(TTLCache(maxsize=256, ttl=1800), key=lambda bbox: tuple(round(float(c), 4) for c in bbox), lock=threading.Lock())
+def get_location_ids(bbox: List[float]) -> List[dict]:
+    URL = "https://api.openaq.org/v3/locations?limit=100&page=1&order_by=id&sort_order=asc"
+    params = {
+        "bbox": f"{bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]}",
+    }
+    headers = {"X-API-Key": get_openaq_api_key()}
+    print( f"DEBUG : \n params : {params}, \n headers : {headers}")
+    with OPENAQ_SEMAPHORE:  # In-flight calls to the OpenAQ REST API, which is rate limited per key
+        response = _SESSION.get(URL, headers=headers, params=params)
+    response.raise_for_status()
+    print("Debug : Response Location Details : ", response.json())
+    return response.json().get("results", [])
+
+
+def _summarize(df: pd.DataFrame) -> dict:
+    """
+    Compact per-location view of the daily statistics for an LLM prompt:
+    {location: {parameter: {"units", "mean", "max", "daily": {date: [mean, max]}}}}.
+    """
+    summary = {}
+    for (location, parameter), group in df.groupby(["location", "parameter"], observed=True, sort=False):
+        means = group["value"].astype("float64").round(1).tolist()
+        maxima = group["value_max"].astype("float64").round(1).tolist()
+        summary.setdefault(location, {})[str(parameter)] = {
+            "units": group["units"].iloc[0],
+            "mean": round(float(group["value"].mean()), 1),
+            "max": round(float(group["value_max"].max()), 1),
+            "daily": dict(zip(group["date"].dt.strftime("%Y-%m-%d"), zip(means, maxima))),
+        }
+    return summary
+
+
+def _log_s3_retry(attempts, response=None, caught_exception=None, operation=None, **kwargs):
+    # Observability only: returns None so botocore's own retry handler still makes the decision
+    status = response[0].status_code if response else None
+    if caught_exception is not None or (status is not None and (status == 429 or status >= 500)):
+        print(f"S3 {operation.name if operation else ''} attempt {attempts} failed: {caught_exception or status}")
+
+
+_S3_CLIENT.meta.events.register('needs-retry.s3', _log_s3_retry)
+
+
+# Raw (still gzipped) archive objects, cached for a day within a byte budget (least recently
+# used evicted first). Settled days are read from the Parquet day cache above before they get
+# here, so this mostly serves recent days; keyed on (bucket, key), safe to share between threads.
+S3_OBJECT_CACHE_BYTES = 64 * 1024 * 1024
+@cached(TTLCache(maxsize=S3_OBJECT_CACHE_BYTES, ttl=86400, getsizeof=len), key=lambda s3_client, bucket, key: (bucket, key), lock=threading.Lock())
+def get_object_bytes(s3_client, bucket: str, key: str) -> bytes:
+    print(f"Downloading: {key}")
+    return s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+
 
 class AirQualityAnalysisTool(BaseTool):
     name: str = "air_quality_analysis"
-    description: str = "Fetch air quality data for specified locations and dates, returning aggregated results."
+    description: str = "Fetch air quality data for specified locations and dates, returning aggregated results. Call it ONCE with the bounding boxes and names of all locations."
     parameters: Optional[List[dict]] = [
         {
             "name": "bounding_boxes",
@@ -66,7 +212,12 @@ class AirQualityAnalysisTool(BaseTool):
             "required": False,
         },
     ]
-    def _run(self, bounding_boxes: List[List[float]], locations: List[str], start_date: str, end_date: str, aq_parameters: Optional[List[str]] = None) -> pd.DataFrame:
+    max_workers: int = BBOX_MAX_WORKERS  # Bounding boxes processed concurrently
+    # Return a compact JSON summary instead of the DataFrame; agents see tool output as text, and
+    # a DataFrame repr is both truncated and far more tokens than the numbers it carries
+    summary_output: bool = False
+
+    def _run(self, bounding_boxes: List[List[float]], locations: List[str], start_date: str, end_date: str, aq_parameters: Optional[List[str]] = None) -> Union[pd.DataFrame, str]:
         """
         Args:
             bounding_boxes (list): List of bounding boxes each box is a list of coordinates [West,  South, East, North].
@@ -76,7 +227,8 @@ class AirQualityAnalysisTool(BaseTool):
             aq_parameters (list, optional): List of air quality parameters to filter. Defaults to None.
 
         Returns:
-            pd.DataFrame: Aggregated air quality data with columns [date, parameter, unit, value, location_name] .
+            pd.DataFrame: Daily air quality statistics with columns [date, parameter, units, value (mean), value_min, value_max, value_p95, location].
+            When summary_output is set, the same data as compact JSON (see _summarize) instead.
         """
         
 
@@ -87,107 +239,146 @@ class AirQualityAnalysisTool(BaseTool):
         except ValueError:
             raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
 
-        # Step 2: Fetch location IDs from OpenAQ
-        def get_location_ids(bbox: List[str]) -> List[dict]:
-            URL = "https://api.openaq.org/v3/locations?limit=100&page=1&order_by=id&sort_order=asc"
-            params = {
-                "bbox": f"{bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]}",
-            }
-            headers = {"X-API-Key": get_openaq_api_key()}
-            print( f"DEBUG : \n params : {params}, \n headers : {headers}")
-            response = requests.get(URL, headers=headers, params=params)
-            response.raise_for_status()
-            print("Debug : Response Location Details : ", response.json())
-            return response.json().get("results", [])
-
         # Step 3: Fetch data from OpenAQ AWS bucket using boto3
-        def fetch_sensor_data(location_ids: List[int], start_date: datetime.date, end_date: datetime.date) -> pd.DataFrame: # Updated type hints
-            consolidated_df = pd.DataFrame()
+        def fetch_sensor_data(location_ids: List[int], start_date: datetime.date, end_date: datetime.date, parameters: Optional[List[str]] = None) -> Tuple[pd.DataFrame, bool]: # Updated type hints
+            # Also reports whether every daily file was fetched; a file absent from the archive is not a failure
+            frames = []
             failed_locations = []  # To track locations that fail to return data
 
-            s3_client = anonymous_session.client('s3', region_name="us-east-1", config=Config(signature_version=UNSIGNED))
+            s3_client = _S3_CLIENT
             source_bucket_name = "openaq-data-archive"
 
-            for location_id in location_ids:
-                for date in pd.date_range(start=start_date, end=end_date):
-                    year, month, day = date.strftime("%Y"), date.strftime("%m"), date.strftime("%d")
-                    prefix = f"records/csv.gz/locationid={location_id}/year={year}/month={month}/"
+            def download_daily_file(location_id: int, year: str, month: str, day: str) -> Optional[pa.Table]:
+                cache_path = _daily_cache_path(location_id, year, month, day)
+                table = _read_cached_day(cache_path)
+                if table is None:
+                    # The archive layout is deterministic, so address the daily file directly instead of listing the prefix
+                    key = f"records/csv.gz/locationid={location_id}/year={year}/month={month}/location-{location_id}-{year}{month}{day}.csv.gz"
                     try:
-                        response = s3_client.list_objects_v2(Bucket=source_bucket_name, Prefix=prefix)
-                        if 'Contents' in response:
-                            for obj in response['Contents']:
-                                key = obj['Key']
-                                if key.endswith(f"{year}{month}{day}.csv.gz"):
-                                    print(f"Downloading: {key}")
-                                    obj_data = s3_client.get_object(Bucket=source_bucket_name, Key=key)
-                                    with gzip.GzipFile(fileobj=obj_data['Body']) as gz_file:
-                                        daily_df = pd.read_csv(gz_file)
-                                        consolidated_df = pd.concat([consolidated_df, daily_df], ignore_index=True)
-                        else:
-                            failed_locations.append(location_id)
-
-                    except Exception as e:
-                        print(f"Error fetching data for location ID {location_id}: {e}")
-                        failed_locations.append(location_id)
+                        payload = get_object_bytes(s3_client, source_bucket_name, key)
+                    except s3_client.exceptions.NoSuchKey:
+                        return None
+                    # One large read + one-shot inflate instead of many small GzipFile.read() calls
+                    decompressed = igzip.decompress(payload)
+                    table = pacsv.read_csv(pa.BufferReader(decompressed), read_options=CSV_READ_OPTIONS, convert_options=CSV_CONVERT_OPTIONS)
+                    if _is_cacheable_day(year, month, day):
+                        _write_cached_day(cache_path, table)
+                if parameters:
+                    # Drop unrequested parameters while still in Arrow, before any pandas objects are built
+                    table = table.filter(pc.is_in(table["parameter"], value_set=pa.array(parameters)))
+                return table
+
+            # Build the full work list up front so every (location, day) download is in flight concurrently;
+            # each requested day is formatted once and reused for every location
+            days = [(date.strftime("%Y"), date.strftime("%m"), date.strftime("%d")) for date in pd.date_range(start=start_date, end=end_date)]
+            work_items = [(location_id, *day) for location_id in location_ids for day in days]
+            locations_with_data = set()
+            complete = True
+            futures = {_S3_EXECUTOR.submit(download_daily_file, *item): item[0] for item in work_items}
+            for future in as_completed(futures):
+                location_id = futures[future]
+                try:
+                    daily_table = future.result()
+                except Exception as e:
+                    print(f"Error fetching data for location ID {location_id}: {e}")
+                    complete = False
+                    continue
+                if daily_table is not None:
+                    frames.append(daily_table)
+                    locations_with_data.add(location_id)
+            failed_locations.extend(location_id for location_id in location_ids if location_id not in locations_with_data)
+
+            consolidated_df = _tables_to_pandas(frames)
             print("Sample Sensor Data from OPENAQ : \n", consolidated_df.head())
             if failed_locations:
                 print(f"Locations with no data or errors: {failed_locations}")
 
-            return consolidated_df
+            return consolidated_df, complete
 
         # Step 4: Aggregate data
         def aggregate_data(df: pd.DataFrame, parameters: Optional[List[str]] = None) -> pd.DataFrame:
-            df['datetime'] = pd.to_datetime(df['datetime'])  # Ensure datetime is parsed correctly
-            df = df.set_index('datetime')  # Set 'datetime' as the index
-
+            # Filter first so only the requested parameters pay for datetime parsing
             if parameters:
-                df = df[df['parameter'].isin(parameters)]  
+                df = df[df['parameter'].isin(parameters)].copy()
+            # OpenAQ timestamps are ISO 8601 with a UTC offset; an explicit format skips inference
+            df['datetime'] = pd.to_datetime(df['datetime'], format=OPENAQ_DATETIME_FORMAT)
+            # 'parameter' has a handful of distinct values; category codes make a much cheaper group key
+            df['parameter'] = df['parameter'].astype('category')
+            # Sensor readings don't need float64; float32 halves the memory the mean has to stream through
+            df['value'] = pd.to_numeric(df['value'], errors='coerce', downcast='float')
+
             try : 
-                # Reset the index to avoid conflicts with 'parameter'
-                df = df.reset_index()     
                 print("DF :\n ", df.head())           
-                daily_data = (
-                    df.groupby(['parameter', pd.Grouper(key='datetime', freq='D')])
-                    .agg(
-                        value=('value', 'mean'),
-                        units=('units', 'first')
-                    )
-                    .dropna()
-                    .reset_index()
-                )  
+                # Truncate to the (local) day and group on a plain column rather than going through
+                # the pd.Grouper resample machinery
+                df = df.assign(datetime=df['datetime'].dt.floor('D'))
+                grouped = df.groupby(['parameter', 'datetime'], observed=True)
+                daily_data = grouped.agg(
+                    value=('value', 'mean'),
+                    value_min=('value', 'min'),
+                    value_max=('value', 'max'),
+                    units=('units', 'first')
+                )
+                # Vectorised per-group quantile; a lambda in agg() would run Python once per group
+                daily_data['value_p95'] = grouped['value'].quantile(0.95).astype(daily_data['value'].dtype)
+                daily_data = daily_data.dropna().reset_index()
             except Exception as e : 
                 print("Aggregation failed with Exception: ", e)
-            daily_data['date'] = daily_data['datetime'].dt.date
+            # Drop the UTC offset (keeping local wall time) and truncate in numpy; avoids a column of Python date objects
+            daily_data['date'] = daily_data['datetime'].dt.tz_localize(None).values.astype('datetime64[D]')
             del daily_data['datetime']
             return daily_data
 
         # Main Workflow
-        all_data = []
-        for bbox, location in zip(bounding_boxes, locations):
+        cacheable_range = end_date_dt <= date.today() - timedelta(days=OPENAQ_CACHE_MIN_AGE_DAYS)
+
+        def process_bbox(bbox: List[float], location: str) -> Optional[pd.DataFrame]:
             try:
                 bbox_openaq_format  = [bbox[1], bbox[0], bbox[3], bbox[2]]  
                 print("FORMAT OF BBOX FOR OPENAQ: ", bbox_openaq_format)       
+                # Historical windows never change, so their results are kept without expiry
+                result_cache_path = _result_cache_path(bbox, start_date_dt.isoformat(), end_date_dt.isoformat(), aq_parameters) if cacheable_range else None
+                cached_table = _read_cached_day(result_cache_path) if result_cache_path else None
+                if cached_table is not None:
+                    print(f"Using cached air quality results for {location}")
+                    aggregated_daily_data = cached_table.to_pandas()
+                    # Parquet has no seconds unit; restore the dtype a fresh aggregation produces
+                    aggregated_daily_data['date'] = aggregated_daily_data['date'].astype('datetime64[s]')
+                    aggregated_daily_data["location"] = location
+                    return aggregated_daily_data
+
                 location_data = get_location_ids(bbox_openaq_format)
                 location_ids = [loc['id'] for loc in location_data]
                 # Open AQ accepts bounding box in the format west, south, east, north
 
                 print(f"Found {len(location_ids)} locations for bounding box (per openAQ format) {bbox_openaq_format} (Location: {location}). Downloading data...")
 
-                consolidated_df = fetch_sensor_data(location_ids, start_date_dt, end_date_dt)
+                consolidated_df, complete = fetch_sensor_data(location_ids, start_date_dt, end_date_dt, aq_parameters)
                 if not consolidated_df.empty:               
                     aggregated_daily_data = aggregate_data(consolidated_df, aq_parameters)
+                    # A result missing days that failed to download must not be kept forever
+                    if result_cache_path and complete:
+                        _write_cached_day(result_cache_path, pa.Table.from_pandas(aggregated_daily_data, preserve_index=False))
                     aggregated_daily_data["location"] = location  # Add the location column
-                    all_data.append(aggregated_daily_data)
+                    return aggregated_daily_data
 
             except Exception as e:
                 print(f"Error processing bounding box {bbox} for location {location}: {e}")
+            return None
+
+        # Each bounding box is independent I/O, so process them concurrently; map() keeps the input order
+        pairs = list(zip(bounding_boxes, locations))
+        with ThreadPoolExecutor(max_workers=max(1, min(len(pairs), self.max_workers))) as executor:
+            all_data = [df for df in executor.map(lambda pair: process_bbox(*pair), pairs) if df is not None]
 
         # Combine all data
         if all_data:
-            result = pd.concat(all_data, ignore_index=True)
-            return result
+            result = pd.concat(all_data, ignore_index=True, copy=False)
         else:
-            return pd.DataFrame(columns=["date", "parameter", "unit", "value", "location"])
+            result = pd.DataFrame(columns=["date", "parameter", "units", *DAILY_VALUE_COLUMNS, "location"])
+        if self.summary_output:
+            return json.dumps(_summarize(result), separators=(",", ":"), ensure_ascii=False)
+        return result
         
 
 tool = BoundingBoxExtractorTool()
@@ -197,11 +388,8 @@ if __name__ == '__main__':
     analysis_tool = AirQualityAnalysisTool()
     locations_to_analyze = [ "Sydney", "Singapore"]
     parameters_to_analyze=["pm25"]
-    bboxes=[]
-    for location in locations_to_analyze : 
-        bbox = tool.run(location=location)
-        print(  "Bounding box : ", bbox)
-        bboxes.append(bbox)
+    bboxes = list(tool.run(locations=locations_to_analyze).values())
+    print(  "Bounding boxes : ", bboxes)
 
 
     start = "2025-01-01"
@@ -16,23 +16,139 @@ import requests
 from crewai.tools import BaseTool # Assuming BaseTool comes from crewai_tools or a similar library
 from typing import List, Optional
 from math import cos, radians
+from functools import lru_cache
+from urllib.parse import quote
+import os
+import re
+import threading
+import time
+import unicodedata
+import diskcache
+import numpy as np
+from .utils import build_http_session, prewarm_connection
+
+# Its own session without status retries: a retried 429/5xx would skip the rate limit gate below
+_SESSION = build_http_session(pool_size=4, retry_status=False)
+# Nominatim allows 1 request per second per client: lookups from concurrent threads are
+# spaced at least that far apart on the monotonic clock. Cache hits never reach the gate.
+NOMINATIM_MIN_INTERVAL = 1.0
+_NOMINATIM_LOCK = threading.Lock()
+_LAST_CALL = [0.0]
+
+# DNS only: a warm-up request would count against the rate limit above
+prewarm_connection(_SESSION, "https://nominatim.openstreetmap.org/", head=False)
+
+# Raw Nominatim boxes persist across runs on disk (Nominatim asks clients to cache);
+# the lru_cache below keeps the in-process lookups free of disk I/O
+BBOX_CACHE_DIR = os.path.expanduser(os.getenv("AIRAWARE_BBOX_CACHE_DIR", "~/.airaware/bboxcache"))
+BBOX_CACHE_TTL_SECONDS = 30 * 86400
+_BBOX_CACHE = diskcache.Cache(BBOX_CACHE_DIR)
+
+
+def _wait_for_nominatim_slot() -> None:
+    with _NOMINATIM_LOCK:
+        delta = time.monotonic() - _LAST_CALL[0]
+        time.sleep(max(0.0, NOMINATIM_MIN_INTERVAL - delta))
+        _LAST_CALL[0] = time.monotonic()
+
+
+@lru_cache(maxsize=1024)
+def _nominatim_lookup(location: str) -> Optional[tuple[float, float, float, float]]:
+    """
+    Query Nominatim for a location and return its raw bounding box as a
+    (south, north, west, east) tuple, or None if the location is unknown.
+
+    Results are memoised per process and found boxes are kept on disk for 30
+    days (keyed on the normalised name), so repeated locations cost a single
+    request (Nominatim is limited to 1 request per second). Request errors
+    propagate and are therefore never cached.
+    """
+    cache_key = re.sub(r"\s+", " ", unicodedata.normalize("NFKD", location)).strip().lower()
+    cached_bbox = _BBOX_CACHE.get(cache_key)
+    if cached_bbox is not None:
+        return cached_bbox
+
+    url = f"https://nominatim.openstreetmap.org/search?q={quote(location)}&format=jsonv2&limit=1&addressdetails=0"
+    headers = {"User-Agent": "CrewAI Tool (vishrajagopalan@gmx.com)"}
+    _wait_for_nominatim_slot()
+    response = _SESSION.get(url, headers=headers)
+    response.raise_for_status()
+    data = response.json()
+    print(data)
+    if not data:
+        return None
+    bbox = tuple(float(coordinate) for coordinate in data[0]['boundingbox'])
+    _BBOX_CACHE.set(cache_key, bbox, expire=BBOX_CACHE_TTL_SECONDS)
+    return bbox
+
+
+def expand_bounding_boxes(bboxes, km_expansion=50) -> np.ndarray:
+    """
+    Vectorised BoundingBoxExtractorTool._expand_bounding_box for many boxes at once.
+
+    Args:
+        bboxes: (N, 4) array-like of [south_lat, west_lon, north_lat, east_lon] boxes.
+        km_expansion (float): Distance in kilometers to grow each box by on every side.
+
+    Returns:
+        np.ndarray: (N, 4) array of expanded boxes in the same order.
+    """
+    bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+    lat_offset = np.full(len(bboxes), km_expansion / 111)  # 1 degree latitude ≈ 111 km
+    lon_offset = km_expansion / (111 * np.cos(np.radians((bboxes[:, 0] + bboxes[:, 2]) / 2)))  # Adjust longitude by latitude
+    return bboxes + np.column_stack([-lat_offset, -lon_offset, lat_offset, lon_offset])
+
+
+def lookup_bounding_boxes(locations: List[str], executor=None, km_expansion=15) -> list:
+    """
+    Geocode many locations and expand all found boxes in one vectorised step.
+
+    Args:
+        locations (List[str]): Location names, geocoded concurrently when an executor is given.
+        executor: Optional concurrent.futures executor for the (rate limited) Nominatim lookups.
+        km_expansion (float): Distance in kilometers to grow each box by, as in the tool.
+
+    Returns:
+        list: Per location, in order, the expanded [south_lat, west_lon, north_lat, east_lon]
+        box or the same error string BoundingBoxExtractorTool would return.
+    """
+    def lookup(location):
+        try:
+            return _nominatim_lookup(location)
+        except requests.exceptions.RequestException as e:
+            return f"Error fetching bounding box for {location}: {e}"
+
+    raw = list(executor.map(lookup, locations) if executor else map(lookup, locations))
+    results = [f"Bounding box not found for location: {location}" if bbox is None else bbox for location, bbox in zip(locations, raw)]
+    found = [i for i, bbox in enumerate(raw) if isinstance(bbox, tuple)]
+    if found:
+        # Nominatim order is (south, north, west, east); expansion works on (south, west, north, east)
+        expanded = expand_bounding_boxes([[raw[i][0], raw[i][2], raw[i][1], raw[i][3]] for i in found], km_expansion=km_expansion)
+        for i, bbox in zip(found, expanded.tolist()):
+            results[i] = bbox
+    return results
+
+
 class BoundingBoxExtractorTool(BaseTool):
     """Tool to extract the bounding box coordinates (south, north, west, east) for a given location name using Nominatim."""
 
     name: str = "bounding_box_extractor"
-    description: str = "Extracts the bounding box coordinates (south, north, west, east) for a given location name."
+    description: str = (
+        "Extracts the expanded bounding box coordinates [south, west, north, east] for a list of location names. "
+        "Call it ONCE with every location; it returns a mapping of each location to its bounding box."
+    )
     parameters: Optional[list[dict]] = [
         {
-            "name": "location",
-            "type": "string",
-            "description": "The name of the location to find the bounding box for.",
+            "name": "locations",
+            "type": "list[str]",
+            "description": "The names of all the locations to find bounding boxes for.",
             "required": True,
         }
     ]
     return_direct: bool = False
 
     def _expand_bounding_box(self, south_lat, west_lon, north_lat, east_lon, km_expansion=50):
-        """Expand the bounding box by a fixed distance (in kilometers)."""
+        """Expand the bounding box by a fixed distance (in kilometers). Use expand_bounding_boxes for many boxes."""
         # Approximate degrees of latitude and longitude for the given expansion
         lat_offset = km_expansion / 111  # 1 degree latitude ≈ 111 km
         lon_offset = km_expansion / (111 * cos(radians((south_lat + north_lat) / 2)))  # Adjust longitude by latitude
@@ -45,29 +161,12 @@ class BoundingBoxExtractorTool(BaseTool):
             east_lon + lon_offset   # East
         ]
         
-    def _run(self, location: str) -> list[str] | str:
-        """Executes the tool to retrieve the bounding box."""
-        url = f"https://nominatim.openstreetmap.org/search?q={location}&format=json&addressdetails=1"
-        headers = {"User-Agent": "CrewAI Tool (vishrajagopalan@gmx.com)"}
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            print(data)
-            if data:
-                bbox = data[0]['boundingbox']
-                print(f"Location: {location} ####### Bounding Box: {bbox}")
-                south_lat = float(bbox[0])
-                north_lat = float(bbox[1])
-                west_lon = float(bbox[2])
-                east_lon = float(bbox[3])
-
-                # Expand the bounding box
-                expanded_bbox = self._expand_bounding_box(south_lat, west_lon, north_lat, east_lon, km_expansion=15)
-                print(f"Expanded Bounding Box: {expanded_bbox}")
-                return expanded_bbox            
-            else:
-                return f"Bounding box not found for location: {location}"
-        except requests.exceptions.RequestException as e:
-            return f"Error fetching bounding box for {location}: {e}"
+    def _run(self, locations: List[str]) -> dict:
+        """Executes the tool to retrieve the bounding boxes of all locations in one call."""
+        if isinstance(locations, str):
+            locations = [locations]
 
+        results = dict(zip(locations, lookup_bounding_boxes(locations)))
+        for location, bbox in results.items():
+            print(f"Location: {location} ####### Expanded Bounding Box: {bbox}")
+        return results
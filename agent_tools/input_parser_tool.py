@@ -10,9 +10,22 @@ This module provides a tool to parse and validate input for air quality analysis
 The input includes location names, date ranges, and parameters for analysis.
 """
 
+import re
 from typing import Type, List
+from datetime import date, datetime
 from pydantic import BaseModel, Field
 from crewai.tools import BaseTool
+from .utils import dedupe_locations
+
+
+ISO_DATE_PATTERN = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+
+def _parse_date(value: str) -> date:
+    # strptime alone also accepts unpadded dates such as 2025-1-5
+    if not ISO_DATE_PATTERN.fullmatch(value):
+        raise ValueError(f"Not a YYYY-MM-DD date: {value}")
+    return datetime.strptime(value, "%Y-%m-%d").date()
 
 
 class AirQualityAnalysisInput(BaseModel):
@@ -49,12 +62,17 @@ class InputParserTool(BaseTool):
             return "Error: At least one location must be specified."
         if not aq_parameters:
             return "Error: At least one air quality parameter must be specified."
-        if start_date >= end_date:
+        try:
+            start = _parse_date(start_date)
+            end = _parse_date(end_date)
+        except ValueError:
+            return "Error: Dates must be valid calendar dates in YYYY-MM-DD format."
+        if start >= end:
             return "Error: The start date must be before the end date."
 
         # Construct the summary of inputs
         input_summary = {
-            "locations": locations,
+            "locations": dedupe_locations(locations),
             "start_date": start_date,
             "end_date": end_date,
             "parameters": aq_parameters,
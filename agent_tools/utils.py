@@ -1,6 +1,13 @@
 # Add your utilities or helper functions to this file.
 
 import os
+import socket
+import threading
+from functools import lru_cache
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv, find_dotenv
 
 # these expect to find a .env file at the directory above the lesson.                                                                                                                     # the format for that file is (without the comment)                                                                                                                                       #API_KEYNAME=AStringThatIsTheLongAPIKeyFromSomeService
@@ -22,6 +29,61 @@ def get_openaq_api_key():
     openai_api_key = os.getenv("OPENAQ_API_KEY")
     return openai_api_key
 
+# pooled HTTP session with retries on transient errors; create one per module and reuse it
+# so repeated calls to the same host skip the TCP + TLS handshake. Rate limited (429) and failed
+# requests are retried once immediately, then after 1, 2, 4 and 8 s (capped at 10 s), each of
+# those waits with up to 1 s of jitter so concurrent workers do not retry in lockstep; a
+# server's Retry-After header takes precedence. With retry_status=False only connection errors
+# are retried and 429/5xx responses are returned, for callers that pace their own requests
+def build_http_session(pool_size=32, retry_status=True):
+    session = requests.Session()
+    retries = Retry(total=5, status=None if retry_status else 0, backoff_factor=0.5, backoff_max=10, backoff_jitter=1, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+    session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries))
+    return session
+
+# in-flight request limits per upstream, shared by every tool and thread in the process so that
+# concurrent fan-out stays under the upstream's rate limit (OpenAQ: 60 requests/min per key)
+OPENAQ_SEMAPHORE = threading.BoundedSemaphore(int(os.getenv("OPENAQ_MAX_CONCURRENCY", "4")))
+OPEN_METEO_SEMAPHORE = threading.BoundedSemaphore(int(os.getenv("OPEN_METEO_MAX_CONCURRENCY", "4")))
+
+# the one session shared by the weather and OpenAQ tools (the geocoder paces its own requests
+# and has its own): each upstream gets its own keep-alive pool, so a connection opened by one
+# tool is reused by the next call
+@lru_cache(maxsize=None)
+def get_http_session():
+    return build_http_session(pool_size=32)
+
+# warm up a host in a background thread at import time so the first real request does not pay
+# for DNS (and, with head=True, TCP + TLS: the HEAD leaves an open connection in the session's
+# pool). Each host is warmed once per process, so repeated calls are cheap; failures are ignored
+_prewarmed_hosts = set()
+_prewarm_lock = threading.Lock()
+
+def prewarm_connection(session, url, head=True):
+    host = urlsplit(url).hostname
+    with _prewarm_lock:
+        if host in _prewarmed_hosts:
+            return
+        _prewarmed_hosts.add(host)
+
+    def warm():
+        try:
+            socket.getaddrinfo(host, 443, proto=socket.IPPROTO_TCP)
+            if head:
+                session.head(url, timeout=5)
+        except (OSError, requests.exceptions.RequestException):
+            pass
+
+    threading.Thread(target=warm, name=f"prewarm-{host}", daemon=True).start()
+
+# drop repeated locations ("New Delhi" vs " new delhi ") before they reach the geocoder,
+# keeping the first spelling the user gave so the report reads naturally
+def dedupe_locations(locations):
+    unique = {}
+    for location in locations:
+        unique.setdefault(" ".join(location.split()).lower(), location.strip())
+    return list(unique.values())
+
 # break line every 80 characters if line is longer than 80 characters
 # don't break in the middle of a word
 def pretty_print_result(result):
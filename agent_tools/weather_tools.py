@@ -14,16 +14,112 @@ on a bounding box and date range.
 
 from typing import Type
 import requests
+import orjson
+import pandas as pd
 from pydantic import BaseModel, Field
 from crewai.tools import BaseTool 
 from typing import List, Optional
-
+from concurrent.futures import ThreadPoolExecutor
+from .utils import get_http_session, prewarm_connection, OPEN_METEO_SEMAPHORE
+
+_SESSION = get_http_session()  # Shared with the other tools
+
+# Open-Meteo daily variable -> key reported back to the agent
+DAILY_VARIABLES = {
+    "time": "date",
+    "temperature_2m_mean": "temperature_mean_2m",
+    "temperature_2m_max": "temperature_max_2m",
+    "temperature_2m_min": "temperature_min_2m",
+    "precipitation_sum": "precipitation_sum",
+    "wind_speed_10m_mean": "wind_speed_10m_mean",
+    "relative_humidity_2m_mean": "relative_humidity_2m_mean",
+}
+BASE_URL = "https://archive-api.open-meteo.com/v1/archive"
+WEATHER_MAX_WORKERS = 16  # Per-location fallback requests issued concurrently
+prewarm_connection(_SESSION, "https://archive-api.open-meteo.com/")
+
+
+def _daily_to_json(daily: dict) -> str:
+    # Build the table in one columnar step; missing variables come back as null
+    weather_summary = (
+        pd.DataFrame(daily)
+        .reindex(columns=list(DAILY_VARIABLES))
+        .rename(columns=DAILY_VARIABLES)
+    )
+    return weather_summary.to_json(orient="records") # Return as string for LLM processing
+
+
+def fetch_weather_batch(bounding_boxes: List[List[float]], start_date: str, end_date: str) -> List[Optional[str]]:
+    """
+    Fetch daily weather for several bounding boxes in one Open-Meteo request.
+
+    Open-Meteo takes comma-separated coordinate lists and returns one result per coordinate,
+    in order. Returns the same JSON records HistoricalWeatherTool produces, one entry per box;
+    an entry is None when the batch answer has no daily data for it (callers fall back to the tool).
+    """
+    if not bounding_boxes:
+        return []
+    centers = [((bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2) for bbox in bounding_boxes]
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in centers),
+        "longitude": ",".join(str(lon) for _, lon in centers),
+        "start_date": start_date,
+        "end_date": end_date,
+        "daily": ",".join(list(DAILY_VARIABLES)[1:]),
+        "timezone": "auto",
+    }
+    with OPEN_METEO_SEMAPHORE:
+        response = _SESSION.get(BASE_URL, params=params)
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+    results = data if isinstance(data, list) else [data]  # a single coordinate is not wrapped in a list
+    if len(results) != len(bounding_boxes):
+        return [None] * len(bounding_boxes)
+    return [_daily_to_json(result["daily"]) if "daily" in result else None for result in results]
+
+
+def fetch_weather(bounding_box: List[float], start_date: str, end_date: str) -> str:
+    """Daily weather for a single bounding box, as JSON records or an error message."""
+    if len(bounding_box) != 4:
+        return "Error: Bounding box must contain exactly 4 float values: [south_lat, west_lon, north_lat, east_lon]."
+
+    # bounding_box is in [south_lat, west_lon, north_lat, east_lon]
+    south_lat, west_lon, north_lat, east_lon = bounding_box[0], bounding_box[1], bounding_box[2], bounding_box[3]
+    
+    # Calculate the center point of the bounding box
+    center_latitude = (south_lat + north_lat) / 2
+    center_longitude = (west_lon + east_lon) / 2
+
+    params = {
+        "latitude": center_latitude,
+        "longitude": center_longitude,
+        "start_date": start_date,
+        "end_date": end_date,
+        "daily": ",".join(list(DAILY_VARIABLES)[1:]),
+        "timezone": "auto" # It's good practice to specify timezone for daily data
+    }
+
+    try:
+        with OPEN_METEO_SEMAPHORE:
+            response = _SESSION.get(BASE_URL, params=params)
+        response.raise_for_status()  # Raise an exception for HTTP errors
+        data = orjson.loads(response.content)
+
+        if "daily" not in data:
+            return f"No daily weather data found for the bounding box {bounding_box} between {start_date} and {end_date}. API response: {data}"
+
+        return _daily_to_json(data["daily"])
+    except requests.exceptions.RequestException as e:
+        return f"Error fetching weather data from Open-Meteo for bounding box {bounding_box}: {e}"
+    except Exception as e:
+        return f"An unexpected error occurred: {e}"
 
 
 class OpenMeteoWeatherInput(BaseModel):
-    """Input for the OpenMeteoHistoricalWeatherTool using a bounding box."""
+    """Input for the OpenMeteoHistoricalWeatherTool using one bounding box per location."""
     # Bounding box format: [south_latitude, west_longitude, north_latitude, east_longitude]
-    bounding_box: List[float] = Field(..., description="Bounding box coordinates in [south_lat, west_lon, north_lat, east_lon] format.")
+    bounding_boxes: List[List[float]] = Field(..., description="Bounding boxes, one per location, each in [south_lat, west_lon, north_lat, east_lon] format.")
+    locations: List[str] = Field(..., description="Location names, in the same order as bounding_boxes.")
     start_date: str = Field(..., description="The start date for historical weather data in YYYY-MM-DD format.")
     end_date: str = Field(..., description="The end date for historical weather data in YYYY-MM-DD format.")
 
@@ -36,69 +132,39 @@ class HistoricalWeatherTool(BaseTool):
     name: str = "HistoricalWeatherTool"
     description: str = (
         "Retrieves DAILY historical weather data (mean temperature, max temperature, min temperature, "
-        "sum of precipitation, mean wind speed, mean relative humidity) for a location "
-        "defined by a bounding box and a date range from Open-Meteo.com (no API key required for non-commercial use). "
-        "The tool internally calculates the center point of the bounding box for the API query."
+        "sum of precipitation, mean wind speed, mean relative humidity) for locations "
+        "defined by bounding boxes and a date range from Open-Meteo.com (no API key required for non-commercial use). "
+        "The tool internally calculates the center point of each bounding box for the API query. "
+        "Call it ONCE with the bounding boxes of all locations; it returns the daily weather keyed by location."
     )
     args_schema: Type[BaseModel] = OpenMeteoWeatherInput
+    max_workers: int = WEATHER_MAX_WORKERS  # Concurrent per-location requests when the batch request falls short
 
-    def _run(self, bounding_box: List[float], start_date: str, end_date: str) -> str:
-        if len(bounding_box) != 4:
-            return "Error: Bounding box must contain exactly 4 float values: [south_lat, west_lon, north_lat, east_lon]."
-
-        # bounding_box is in [south_lat, west_lon, north_lat, east_lon]
-        south_lat, west_lon, north_lat, east_lon = bounding_box[0], bounding_box[1], bounding_box[2], bounding_box[3]
-        
-        # Calculate the center point of the bounding box
-        center_latitude = (south_lat + north_lat) / 2
-        center_longitude = (west_lon + east_lon) / 2
-
-        base_url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": center_latitude,
-            "longitude": center_longitude,
-            "start_date": start_date,
-            "end_date": end_date,
-            "daily": "temperature_2m_mean,temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_mean,relative_humidity_2m_mean",
-            "timezone": "auto" # It's good practice to specify timezone for daily data
-        }
+    def _run(self, bounding_boxes: List[List[float]], locations: List[str], start_date: str, end_date: str) -> str:
+        if len(bounding_boxes) != len(locations):
+            return "Error: Provide exactly one bounding box per location, in the same order."
+        if any(len(bbox) != 4 for bbox in bounding_boxes):
+            return "Error: Each bounding box must contain exactly 4 float values: [south_lat, west_lon, north_lat, east_lon]."
 
+        # One multi-coordinate request for every location; per-location requests only as a fallback
         try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            data = response.json()
-
-            if "daily" not in data:
-                return f"No daily weather data found for the bounding box {bounding_box} between {start_date} and {end_date}. API response: {data}"
-
-            daily_data = data["daily"]
-            times = daily_data.get("time", [])
-            temp_means = daily_data.get("temperature_2m_mean", [])
-            temp_maxs = daily_data.get("temperature_2m_max", [])
-            temp_mins = daily_data.get("temperature_2m_min", [])
-            precipitations = daily_data.get("precipitation_sum", [])
-            wind_speeds_mean = daily_data.get("wind_speed_10m_mean", [])
-            humidities_mean = daily_data.get("relative_humidity_2m_mean", [])
-
-            weather_summary = []
-            for i in range(len(times)):
-                summary = {
-                    "date": times[i],
-                    "temperature_mean_2m": temp_means[i] if i < len(temp_means) else "N/A",
-                    "temperature_max_2m": temp_maxs[i] if i < len(temp_maxs) else "N/A",
-                    "temperature_min_2m": temp_mins[i] if i < len(temp_mins) else "N/A",
-                    "precipitation_sum": precipitations[i] if i < len(precipitations) else "N/A",
-                    "wind_speed_10m_mean": wind_speeds_mean[i] if i < len(wind_speeds_mean) else "N/A",
-                    "relative_humidity_2m_mean": humidities_mean[i] if i < len(humidities_mean) else "N/A"
-                }
-                weather_summary.append(summary)
-
-            return str(weather_summary) # Return as string for LLM processing
-        except requests.exceptions.RequestException as e:
-            return f"Error fetching weather data from Open-Meteo for bounding box {bounding_box}: {e}"
-        except Exception as e:
-            return f"An unexpected error occurred: {e}"
-        
+            summaries = fetch_weather_batch(bounding_boxes, start_date, end_date)
+        except (requests.exceptions.RequestException, ValueError) as e:  # ValueError: malformed JSON
+            print(f"Batch weather request failed, falling back to per-location requests: {e}")
+            summaries = [None] * len(bounding_boxes)
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(len(missing), self.max_workers))) as executor:
+                for i, summary in zip(missing, executor.map(lambda i: fetch_weather(bounding_boxes[i], start_date, end_date), missing)):
+                    summaries[i] = summary
+
+        # Records are already JSON; errors are plain messages and get encoded as JSON strings
+        weather = {
+            location: orjson.Fragment(summary) if summary.startswith("[") else summary
+            for location, summary in zip(locations, summaries)
+        }
+        return orjson.dumps(weather).decode() # Return as string for LLM processing
+
 # Only for Testing
 # def main(location: str, start_date: str, end_date: str):
 #     """
@@ -13,12 +13,23 @@ for geographical lookup.
 
 from pydantic import BaseModel, Field
 from typing import List, Optional, Any
-from datetime import datetime
+from datetime import datetime, date, timedelta
+from pathlib import Path
 import requests
 import pandas as pd
-import gzip
+import pyarrow as pa
+from pyarrow import csv as pacsv
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+try:
+    from isal import igzip  # ISA-L backed, much faster inflate than the stdlib
+except ImportError:
+    import gzip as igzip
+import os
 import json
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import boto3
 from botocore import UNSIGNED
 from botocore.config import Config
@@ -27,6 +38,66 @@ from botocore.config import Config
 URL = "https://api.openaq.org/v3/locations?limit=100&page=1&order_by=id&sort_order=asc"
 SOURCE_BUCKET_NAME = "openaq-data-archive"
 ANONYMOUS_SESSION = boto3.Session()
+S3_MAX_WORKERS = 32
+S3_MAX_POOL_CONNECTIONS = 64
+S3_CLIENT = ANONYMOUS_SESSION.client(
+    "s3", region_name="us-east-1",
+    config=Config(signature_version=UNSIGNED, max_pool_connections=S3_MAX_POOL_CONNECTIONS, retries={"max_attempts": 5, "mode": "adaptive"}),
+)
+OPENAQ_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+# 'datetime' is kept as a string so pandas preserves the local UTC offset when parsing it
+CSV_READ_OPTIONS = pacsv.ReadOptions(use_threads=True)
+CSV_CONVERT_OPTIONS = pacsv.ConvertOptions(
+    include_columns=["datetime", "parameter", "value", "units"],
+    column_types={"datetime": pa.string()},
+)
+
+
+# Parsed daily files are kept on disk as Parquet so reruns skip both the S3 round trip and the
+# decompress + CSV parse. Only days old enough to be final are cached, since the archive may
+# still be back-filled for the most recent days.
+OPENAQ_CACHE_DIR = Path(os.getenv("OPENAQ_CACHE_DIR", "~/.cache/openaq")).expanduser()
+OPENAQ_CACHE_MIN_AGE_DAYS = 3
+
+
+def _daily_cache_path(location_id: int, year: str, month: str, day: str) -> Path:
+    return OPENAQ_CACHE_DIR / f"loc={location_id}" / f"date={year}{month}{day}.parquet"
+
+
+def _is_cacheable_day(year: str, month: str, day: str) -> bool:
+    return date(int(year), int(month), int(day)) <= date.today() - timedelta(days=OPENAQ_CACHE_MIN_AGE_DAYS)
+
+
+def _read_cached_day(path: Path) -> Optional[pa.Table]:
+    if not path.exists():
+        return None
+    try:
+        return pq.read_table(path)
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"Ignoring unreadable cache file {path}: {e}")
+        return None
+
+
+def _write_cached_day(path: Path, table: pa.Table) -> None:
+    # Write to a per-thread temp file and rename into place, so concurrent workers never see a partial file
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not write cache file {path}: {e}")
+
+
+def _log_s3_retry(attempts, response=None, caught_exception=None, operation=None, **kwargs):
+    # Observability only: returns None so botocore's own retry handler still makes the decision
+    status = response[0].status_code if response else None
+    if caught_exception is not None or (status is not None and (status == 429 or status >= 500)):
+        print(f"S3 {operation.name if operation else ''} attempt {attempts} failed: {caught_exception or status}")
+
+
+S3_CLIENT.meta.events.register("needs-retry.s3", _log_s3_retry)
+
 
 class UserParameters(BaseModel):
     api_key: str = Field(description="API key for OpenAQ access")
@@ -52,45 +123,65 @@ def run_tool(config: UserParameters, args: ToolParameters) -> Any:
         print("Debug : Response Location Details : ", response.json())
         return response.json().get("results", [])
 
-    def fetch_sensor_data(location_ids: List[int], start_date: datetime.date, end_date: datetime.date) -> pd.DataFrame:
-        consolidated_df = pd.DataFrame()
-        s3_client = ANONYMOUS_SESSION.client("s3", region_name="us-east-1", config=Config(signature_version=UNSIGNED))
+    def fetch_sensor_data(location_ids: List[int], start_date: datetime.date, end_date: datetime.date, parameters: Optional[List[str]] = None) -> pd.DataFrame:
+        frames = []
+        s3_client = S3_CLIENT
 
-        for location_id in location_ids:
-            for date in pd.date_range(start=start_date, end=end_date):
-                year, month, day = date.strftime("%Y"), date.strftime("%m"), date.strftime("%d")
-                prefix = f"records/csv.gz/locationid={location_id}/year={year}/month={month}/"
+        def download_daily_file(location_id: int, year: str, month: str, day: str) -> Optional[pa.Table]:
+            cache_path = _daily_cache_path(location_id, year, month, day)
+            table = _read_cached_day(cache_path)
+            if table is None:
+                key = f"records/csv.gz/locationid={location_id}/year={year}/month={month}/location-{location_id}-{year}{month}{day}.csv.gz"
                 try:
-                    response = s3_client.list_objects_v2(Bucket=SOURCE_BUCKET_NAME, Prefix=prefix)
-                    if "Contents" in response:
-                        for obj in response["Contents"]:
-                            key = obj["Key"]
-                            if key.endswith(f"{year}{month}{day}.csv.gz"):
-                                obj_data = s3_client.get_object(Bucket=SOURCE_BUCKET_NAME, Key=key)
-                                with gzip.GzipFile(fileobj=obj_data["Body"]) as gz_file:
-                                    daily_df = pd.read_csv(gz_file)
-                                    consolidated_df = pd.concat([consolidated_df, daily_df], ignore_index=True)
+                    obj_data = s3_client.get_object(Bucket=SOURCE_BUCKET_NAME, Key=key)
+                except s3_client.exceptions.NoSuchKey:
+                    return None
+                decompressed = igzip.decompress(obj_data["Body"].read())
+                table = pacsv.read_csv(pa.BufferReader(decompressed), read_options=CSV_READ_OPTIONS, convert_options=CSV_CONVERT_OPTIONS)
+                if _is_cacheable_day(year, month, day):
+                    _write_cached_day(cache_path, table)
+            if parameters:
+                table = table.filter(pc.is_in(table["parameter"], value_set=pa.array(parameters)))
+            return table
+
+        days = [(date.strftime("%Y"), date.strftime("%m"), date.strftime("%d")) for date in pd.date_range(start=start_date, end=end_date)]
+        work_items = [(location_id, *day) for location_id in location_ids for day in days]
+        with ThreadPoolExecutor(max_workers=S3_MAX_WORKERS) as executor:
+            futures = {executor.submit(download_daily_file, *item): item[0] for item in work_items}
+            for future in as_completed(futures):
+                try:
+                    daily_table = future.result()
                 except Exception as e:
-                    print(f"Error fetching data for location ID {location_id}: {e}")
+                    print(f"Error fetching data for location ID {futures[future]}: {e}")
+                    continue
+                if daily_table is not None:
+                    frames.append(daily_table)
 
-        return consolidated_df
+        if not frames:
+            return pd.DataFrame()
+        # One Arrow concat (widening per-file inferred types) and a single conversion to pandas
+        combined = pa.concat_tables(frames, promote_options="permissive")
+        return combined.to_pandas(types_mapper=pd.ArrowDtype, self_destruct=True)
 
     def aggregate_data(df: pd.DataFrame, parameters: Optional[List[str]]) -> pd.DataFrame:
-        df["datetime"] = pd.to_datetime(df["datetime"])
-        df = df.set_index("datetime")
-
         if parameters:
-            df = df[df["parameter"].isin(parameters)]
-
-        daily_data = (
-            df.reset_index()
-            .groupby(["parameter", pd.Grouper(key="datetime", freq="D")])
-            .agg(value=("value", "mean"), units=("units", "first"))
-            .dropna()
-            .reset_index()
+            df = df[df["parameter"].isin(parameters)].copy()
+        df["datetime"] = pd.to_datetime(df["datetime"], format=OPENAQ_DATETIME_FORMAT)
+        df["parameter"] = df["parameter"].astype("category")
+        df["value"] = pd.to_numeric(df["value"], errors="coerce", downcast="float")
+
+        # Daily mean plus spread, so the analyst gets pre-computed statistics rather than raw readings
+        grouped = df.assign(datetime=df["datetime"].dt.floor("D")).groupby(["parameter", "datetime"], observed=True)
+        daily_data = grouped.agg(
+            value=("value", "mean"),
+            value_min=("value", "min"),
+            value_max=("value", "max"),
+            units=("units", "first"),
         )
+        daily_data["value_p95"] = grouped["value"].quantile(0.95).astype(daily_data["value"].dtype)
+        daily_data = daily_data.dropna().reset_index()
 
-        daily_data["date"] = daily_data["datetime"].dt.date
+        daily_data["date"] = daily_data["datetime"].dt.tz_localize(None).values.astype("datetime64[D]")
         del daily_data["datetime"]
         return daily_data
 
@@ -102,16 +193,16 @@ def run_tool(config: UserParameters, args: ToolParameters) -> Any:
         location_data = get_location_ids(bbox_openaq_format)
         location_ids = [loc["id"] for loc in location_data]
 
-        consolidated_df = fetch_sensor_data(location_ids, args.start_date, args.end_date)
+        consolidated_df = fetch_sensor_data(location_ids, args.start_date, args.end_date, args.aq_parameters)
         if not consolidated_df.empty:
             aggregated_daily_data = aggregate_data(consolidated_df, args.aq_parameters)
             aggregated_daily_data["location"] = location
             all_data.append(aggregated_daily_data)
 
     if all_data:
-        return pd.concat(all_data, ignore_index=True)
+        return pd.concat(all_data, ignore_index=True, copy=False)
     else:
-        return pd.DataFrame(columns=["date", "parameter", "unit", "value", "location"])
+        return pd.DataFrame(columns=["date", "parameter", "units", "value", "value_min", "value_max", "value_p95", "location"])
 
 OUTPUT_KEY = "tool_output"
 
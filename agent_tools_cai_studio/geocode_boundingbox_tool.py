@@ -10,19 +10,89 @@ This tool retrieves geographical bounding box coordinates (south, north, west, e
 for a given location name by querying the Nominatim OpenStreetMap API.
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, Any
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import TYPE_CHECKING, List, Optional, Any
 import json
+import orjson
 import argparse
+import asyncio
+import os
+import re
+import threading
+import time
+import unicodedata
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import diskcache
 from math import cos, radians
+from urllib.parse import quote
+
+# httpx and numpy are only needed by the async and batch helpers; importing them lazily keeps
+# the per-invocation startup of the CLI entrypoint down
+if TYPE_CHECKING:
+    import httpx
+    import numpy as np
+
+# Keep-alive session reused across calls so consecutive requests to the same host skip the
+# TCP + TLS handshake; connection errors are retried with backoff. Rate limited (429) and failed
+# (5xx) answers are not retried here but in _get_nominatim, behind the rate limit gate below
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10, pool_maxsize=10,
+    max_retries=Retry(total=3, status=0, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False),
+))
+HTTP_TIMEOUT = (3, 10)  # (connect, read) seconds
+
+# Only the top-ranked match is used, so ask for just that one and skip the address breakdown
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search?q={location}&format=jsonv2&limit=1&addressdetails=0"
+HEADERS = {"User-Agent": "AirAware Data For Good (vishrajagopalan@gmx.com) "}
+
+# Nominatim's usage policy allows at most 1 request per second; cache hits never wait here
+NOMINATIM_MIN_INTERVAL = 1.0
+_NOMINATIM_LOCK = threading.Lock()
+_LAST_CALL = [0.0]
+
+
+def _wait_for_nominatim_slot() -> None:
+    """Block until at least NOMINATIM_MIN_INTERVAL has passed since the previous request."""
+    with _NOMINATIM_LOCK:
+        delta = time.monotonic() - _LAST_CALL[0]
+        time.sleep(max(0.0, NOMINATIM_MIN_INTERVAL - delta))
+        _LAST_CALL[0] = time.monotonic()
+
+
+NOMINATIM_RETRY_STATUSES = (429, 500, 502, 503, 504)
+NOMINATIM_MAX_ATTEMPTS = 3
+
+
+def _get_nominatim(url: str, headers: dict) -> requests.Response:
+    """GET a Nominatim URL, retrying 429/5xx answers; every attempt waits for its own slot."""
+    for _ in range(NOMINATIM_MAX_ATTEMPTS):
+        _wait_for_nominatim_slot()
+        response = _SESSION.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+        if response.status_code not in NOMINATIM_RETRY_STATUSES:
+            break
+    return response
+
+# Nominatim's usage policy asks clients to cache results; bounding boxes barely change, so
+# expanded boxes are kept on disk (shared between tool processes) for 30 days
+GEOCACHE_DIR = os.path.expanduser(os.getenv("AIRAWARE_GEOCACHE_DIR", "~/.airaware/geocache"))
+GEOCACHE_TTL_SECONDS = 30 * 86400
+_geo_cache = diskcache.Cache(GEOCACHE_DIR)
+
+
+def _location_cache_key(location: str) -> str:
+    """Normalize a location name so trivially different spellings share a cache entry."""
+    normalized = unicodedata.normalize("NFKD", location)
+    return re.sub(r"\s+", " ", normalized).strip().lower()
 
 
 class UserParameters(BaseModel):
     """
     Parameters used to configure the tool. This may include API keys, user agents, etc.
     """
-    pass
+    model_config = ConfigDict(frozen=True, extra="ignore")
 
 
 class ToolParameters(BaseModel):
@@ -30,9 +100,15 @@ class ToolParameters(BaseModel):
     Arguments of the tool call. These arguments are passed to this tool whenever
     an Agent calls this tool.
     """
+    model_config = ConfigDict(frozen=True, extra="ignore")
     location: str = Field(description="The name of the location to find the bounding box for.")
 
 
+# Validators are compiled once per process instead of on every model construction
+_USER_ADAPTER = TypeAdapter(UserParameters)
+_TOOL_ADAPTER = TypeAdapter(ToolParameters)
+
+
 class BoundingBoxExtractor:
     @staticmethod
     def expand_bounding_box(south_lat, west_lon, north_lat, east_lon, km_expansion=50):
@@ -47,32 +123,98 @@ class BoundingBoxExtractor:
             east_lon + lon_offset   # East
         ]
 
+    @staticmethod
+    def expand_bounding_box_batch(bboxes, km_expansion=50) -> "np.ndarray":
+        """Expand N [south_lat, west_lon, north_lat, east_lon] boxes at once; returns an (N, 4) array."""
+        import numpy as np
+
+        bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+        mid_lat = 0.5 * (bboxes[:, 0] + bboxes[:, 2])
+        lat_offset = np.full(len(bboxes), km_expansion / 111)  # 1 degree latitude ≈ 111 km
+        lon_offset = km_expansion / (111 * np.cos(np.radians(mid_lat)))  # Adjust longitude by latitude
+        return bboxes + np.stack([-lat_offset, -lon_offset, lat_offset, lon_offset], axis=1)
+
+    @staticmethod
+    def _cache_bbox(cache_key: str, expanded_bbox: list, etag: Optional[str] = None) -> dict:
+        """Cache an expanded box (plus its ETag, kept past the TTL for revalidation) and wrap it."""
+        _geo_cache.set(cache_key, expanded_bbox, expire=GEOCACHE_TTL_SECONDS)
+        if etag:
+            _geo_cache.set(("etag", cache_key), (etag, expanded_bbox))
+        return {"expanded_bounding_box": expanded_bbox}
+
+    @staticmethod
+    def _bbox_from_response(location: str, data: list, cache_key: str, etag: Optional[str] = None) -> dict:
+        """Expand the first Nominatim match and cache it, or report the location as unknown."""
+        if data:
+            bbox = data[0]['boundingbox']
+            south_lat = float(bbox[0])
+            north_lat = float(bbox[1])
+            west_lon = float(bbox[2])
+            east_lon = float(bbox[3])
+
+            expanded_bbox = BoundingBoxExtractor.expand_bounding_box(south_lat, west_lon, north_lat, east_lon, km_expansion=15)
+            return BoundingBoxExtractor._cache_bbox(cache_key, expanded_bbox, etag)
+        else:
+            return {"error": f"Bounding box not found for location: {location}"}
+
     @staticmethod
     def run_tool(config: UserParameters, args: ToolParameters) -> Any:
         """Main tool code logic."""
-        url = f"https://nominatim.openstreetmap.org/search?q={args.location}&format=json&addressdetails=1"
-        headers = {"User-Agent": "AirAware Data For Good (vishrajagopalan@gmx.com) "}
-
+        cache_key = _location_cache_key(args.location)
+        cached_bbox = _geo_cache.get(cache_key)
+        if cached_bbox is not None:
+            return {"expanded_bounding_box": cached_bbox}
+
+        # An expired entry may still be revalidated with its ETag instead of re-downloaded
+        validator = _geo_cache.get(("etag", cache_key))
+        headers = {**HEADERS, "If-None-Match": validator[0]} if validator else HEADERS
         try:
-            response = requests.get(url, headers=headers)
+            response = _get_nominatim(NOMINATIM_URL.format(location=quote(args.location)), headers)
+            if response.status_code == 304 and validator:
+                return BoundingBoxExtractor._cache_bbox(cache_key, validator[1])
             response.raise_for_status()
-            data = response.json()
+            return BoundingBoxExtractor._bbox_from_response(args.location, orjson.loads(response.content), cache_key, response.headers.get("ETag"))
 
-            if data:
-                bbox = data[0]['boundingbox']
-                south_lat = float(bbox[0])
-                north_lat = float(bbox[1])
-                west_lon = float(bbox[2])
-                east_lon = float(bbox[3])
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            return {"error": f"Error fetching bounding box for {args.location}: {e}"}
 
-                expanded_bbox = BoundingBoxExtractor.expand_bounding_box(south_lat, west_lon, north_lat, east_lon, km_expansion=15)
-                return {"expanded_bounding_box": expanded_bbox}
-            else:
-                return {"error": f"Bounding box not found for location: {args.location}"}
+    @staticmethod
+    async def run_tool_async(config: UserParameters, args: ToolParameters, client: "httpx.AsyncClient") -> Any:
+        """Async variant of run_tool over a shared (HTTP/2) httpx client; same return shape."""
+        import httpx
+
+        cache_key = _location_cache_key(args.location)
+        cached_bbox = _geo_cache.get(cache_key)
+        if cached_bbox is not None:
+            return {"expanded_bounding_box": cached_bbox}
+
+        # An expired entry may still be revalidated with its ETag instead of re-downloaded
+        validator = _geo_cache.get(("etag", cache_key))
+        headers = {**HEADERS, "If-None-Match": validator[0]} if validator else HEADERS
+        await asyncio.to_thread(_wait_for_nominatim_slot)
+        try:
+            response = await client.get(NOMINATIM_URL.format(location=quote(args.location)), headers=headers)
+            if response.status_code == 304 and validator:
+                return BoundingBoxExtractor._cache_bbox(cache_key, validator[1])
+            response.raise_for_status()
+            return BoundingBoxExtractor._bbox_from_response(args.location, orjson.loads(response.content), cache_key, response.headers.get("ETag"))
 
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
             return {"error": f"Error fetching bounding box for {args.location}: {e}"}
 
+    @staticmethod
+    def run_tool_many(config: UserParameters, locations: List[str]) -> List[Any]:
+        """Geocode several locations concurrently over one multiplexed HTTP/2 connection, in order."""
+        import httpx
+
+        async def gather():
+            async with httpx.AsyncClient(http2=True, timeout=httpx.Timeout(HTTP_TIMEOUT[1], connect=HTTP_TIMEOUT[0])) as client:
+                return await asyncio.gather(*[
+                    BoundingBoxExtractor.run_tool_async(config, _TOOL_ADAPTER.validate_python({"location": location}), client)
+                    for location in locations
+                ])
+        return list(asyncio.run(gather()))
+
 
 OUTPUT_KEY = "tool_output"
 
@@ -87,8 +229,8 @@ if __name__ == "__main__":
     tool_dict = json.loads(args.tool_params)
 
     # Validate dictionaries against Pydantic models
-    config = UserParameters(**user_dict)
-    params = ToolParameters(**tool_dict)
+    config = _USER_ADAPTER.validate_python(user_dict)
+    params = _TOOL_ADAPTER.validate_python(tool_dict)
 
     # Run the tool
     output = BoundingBoxExtractor.run_tool(config, params)
@@ -12,16 +12,28 @@ The input includes location names, date ranges, and parameters for analysis.
 
 import json
 import argparse
-from pydantic import BaseModel, Field
+import re
+from datetime import date, datetime
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import List, Optional, Any
 
 
+ISO_DATE_PATTERN = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+
+def _parse_date(value: str) -> date:
+    # strptime alone also accepts unpadded dates such as 2025-1-5
+    if not ISO_DATE_PATTERN.fullmatch(value):
+        raise ValueError(f"Not a YYYY-MM-DD date: {value}")
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
 class UserParameters(BaseModel):
     """
     Parameters used to configure a tool. This may include API keys,
     database connections, environment variables, etc.
     """
-    pass  # This tool does not require user-specific parameters.
+    model_config = ConfigDict(frozen=True, extra="ignore")  # This tool does not require user-specific parameters.
 
 
 class ToolParameters(BaseModel):
@@ -30,12 +42,18 @@ class ToolParameters(BaseModel):
     an Agent calls this tool. The descriptions below are also provided to agents
     to help them make informed decisions of what to pass to the tool.
     """
+    model_config = ConfigDict(frozen=True, extra="ignore")
     locations: List[str] = Field(..., description="List of location names for air quality analysis.")
     start_date: str = Field(..., description="Start date for the analysis in YYYY-MM-DD format.")
     end_date: str = Field(..., description="End date for the analysis in YYYY-MM-DD format.")
     aq_parameters: List[str] = Field(..., description="List of air quality parameters to analyze (e.g., pm10, pm25).")
 
 
+# Validators are compiled once per process instead of on every model construction
+_USER_ADAPTER = TypeAdapter(UserParameters)
+_TOOL_ADAPTER = TypeAdapter(ToolParameters)
+
+
 def run_tool(config: UserParameters, args: ToolParameters) -> Any:
     """
     Main tool code logic. Anything returned from this method is returned
@@ -46,12 +64,22 @@ def run_tool(config: UserParameters, args: ToolParameters) -> Any:
         return {"error": "At least one location must be specified."}
     if not args.aq_parameters:
         return {"error": "At least one air quality parameter must be specified."}
-    if args.start_date >= args.end_date:
+    try:
+        start = _parse_date(args.start_date)
+        end = _parse_date(args.end_date)
+    except ValueError:
+        return {"error": "Dates must be valid calendar dates in YYYY-MM-DD format."}
+    if start >= end:
         return {"error": "The start date must be before the end date."}
 
+    # Drop repeated locations, keeping the first spelling given
+    locations = {}
+    for location in args.locations:
+        locations.setdefault(" ".join(location.split()).lower(), location.strip())
+
     # Construct the summary of inputs
     input_summary = {
-        "locations": args.locations,
+        "locations": list(locations.values()),
         "start_date": args.start_date,
         "end_date": args.end_date,
         "parameters": args.aq_parameters,
@@ -91,8 +119,8 @@ if __name__ == "__main__":
     tool_dict = json.loads(args.tool_params)
     
     # Validate dictionaries against Pydantic models
-    config = UserParameters(**user_dict)
-    params = ToolParameters(**tool_dict)
+    config = _USER_ADAPTER.validate_python(user_dict)
+    params = _TOOL_ADAPTER.validate_python(tool_dict)
     
     # Run the tool.
     output = run_tool(config, params)
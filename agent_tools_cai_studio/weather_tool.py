@@ -12,11 +12,40 @@ and a date range from Open-Meteo.com. It internally calculates the center point
 the API query. No API key is required for non-commercial use.
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import TYPE_CHECKING, List, Optional, Any, Tuple
 import json
+import orjson
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import argparse
+import os
+import diskcache
+from datetime import date, timedelta
+from dataclasses import dataclass
+
+# httpx is only needed by the async helpers; importing it lazily keeps the per-invocation
+# startup of the CLI entrypoint down
+if TYPE_CHECKING:
+    import httpx
+
+# Keep-alive session reused across calls so consecutive requests to the same host skip the
+# TCP + TLS handshake; transient errors and rate limiting are retried with backoff
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10, pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False),
+))
+HTTP_TIMEOUT = (3, 10)  # (connect, read) seconds
+
+# Archive answers for settled dates never change, so they are cached on disk without expiry.
+# Ranges reaching into the last few days (the archive is still backfilling them) expire after an hour.
+WEATHER_CACHE_DIR = os.path.expanduser(os.getenv("AIRAWARE_WEATHER_CACHE_DIR", "~/.airaware/weathercache"))
+WEATHER_CACHE_SETTLED_DAYS = 5
+WEATHER_CACHE_RECENT_TTL_SECONDS = 3600
+_weather_cache = diskcache.Cache(WEATHER_CACHE_DIR)
 
 
 class UserParameters(BaseModel):
@@ -24,7 +53,7 @@ class UserParameters(BaseModel):
     Parameters used to configure the tool. User-specific configuration
     such as API keys or environment settings can be defined here.
     """
-    pass  # This tool does not require user-specific parameters.
+    model_config = ConfigDict(frozen=True, extra="ignore")  # This tool does not require user-specific parameters.
 
 
 class ToolParameters(BaseModel):
@@ -33,6 +62,7 @@ class ToolParameters(BaseModel):
     an Agent calls this tool. The descriptions below are provided to agents
     to help them make informed decisions about what to pass to the tool.
     """
+    model_config = ConfigDict(frozen=True, extra="ignore")
     bounding_box: List[float] = Field(
         ..., description="Bounding box coordinates in [south_lat, west_lon, north_lat, east_lon] format."
     )
@@ -44,59 +74,216 @@ class ToolParameters(BaseModel):
     )
 
 
-def run_tool(config: UserParameters, args: ToolParameters) -> Any:
-    """
-    Main tool code logic. Retrieves historical weather data from Open-Meteo.com
-    for the specified bounding box and date range.
-    """
-    if len(args.bounding_box) != 4:
-        return {"error": "Bounding box must contain exactly 4 float values: [south_lat, west_lon, north_lat, east_lon]."}
+# Validators are compiled once per process instead of on every model construction
+_USER_ADAPTER = TypeAdapter(UserParameters)
+_TOOL_ADAPTER = TypeAdapter(ToolParameters)
 
-    # Calculate the center point of the bounding box
-    south_lat, west_lon, north_lat, east_lon = args.bounding_box
-    center_latitude = (south_lat + north_lat) / 2
-    center_longitude = (west_lon + east_lon) / 2
 
-    base_url = "https://archive-api.open-meteo.com/v1/archive"
-    params = {
+@dataclass(slots=True, frozen=True)
+class _ToolArgs:
+    """Already-validated call arguments used on the in-process path, without Pydantic overhead."""
+    bounding_box: Tuple[float, ...]
+    start_date: str
+    end_date: str
+
+    @classmethod
+    def from_parameters(cls, args: ToolParameters) -> "_ToolArgs":
+        return cls(tuple(args.bounding_box), args.start_date, args.end_date)
+
+
+BASE_URL = "https://archive-api.open-meteo.com/v1/archive"
+# Open-Meteo variable -> key in the daily summary
+SUMMARY_KEYS = {
+    "time": "date",
+    "temperature_2m_mean": "temperature_mean_2m",
+    "temperature_2m_max": "temperature_max_2m",
+    "temperature_2m_min": "temperature_min_2m",
+    "precipitation_sum": "precipitation_sum",
+    "wind_speed_10m_mean": "wind_speed_10m_mean",
+    "relative_humidity_2m_mean": "relative_humidity_2m_mean",
+}
+DAILY_VARIABLES = ",".join(list(SUMMARY_KEYS)[1:])
+
+
+def bounding_box_center(bounding_box: List[float]) -> Tuple[float, float]:
+    """Center (latitude, longitude) of a [south_lat, west_lon, north_lat, east_lon] box."""
+    south_lat, west_lon, north_lat, east_lon = bounding_box
+    return (south_lat + north_lat) / 2, (west_lon + east_lon) / 2
+
+
+def summarize_daily(daily_data: dict) -> List[dict]:
+    """Turn Open-Meteo's columnar "daily" block into one record per day."""
+    dates = daily_data.get("time") or []
+    # Pull each column out once and zip the rows together; a missing variable reads as None
+    series = [dates] + [daily_data.get(variable) or [None] * len(dates) for variable in list(SUMMARY_KEYS)[1:]]
+    return [dict(zip(SUMMARY_KEYS.values(), row)) for row in zip(*series)]
+
+
+def request_params(args: _ToolArgs) -> dict:
+    """Open-Meteo query for the center point of the bounding box."""
+    # Calculate the center point of the bounding box
+    center_latitude, center_longitude = bounding_box_center(args.bounding_box)
+    return {
         "latitude": center_latitude,
         "longitude": center_longitude,
         "start_date": args.start_date,
         "end_date": args.end_date,
-        "daily": "temperature_2m_mean,temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_mean,relative_humidity_2m_mean",
+        "daily": DAILY_VARIABLES,
         "timezone": "auto",
     }
 
+
+def summary_from_response(data: dict) -> Any:
+    if "daily" not in data:
+        return {"error": f"No daily weather data found for the given parameters. Response: {data}"}
+    return summarize_daily(data["daily"])
+
+
+def _weather_cache_key(args: _ToolArgs) -> tuple:
+    # Centers are rounded to ~1 km so slightly different boxes around the same place share an entry
+    center_latitude, center_longitude = bounding_box_center(args.bounding_box)
+    return round(center_latitude, 2), round(center_longitude, 2), args.start_date, args.end_date
+
+
+def _cache_summary(args: _ToolArgs, summary: Any, etag: Optional[str] = None) -> Any:
+    """Store a successful summary under the request's key and return it unchanged."""
+    if isinstance(summary, list):
+        try:
+            end = date.fromisoformat(args.end_date)
+        except ValueError:
+            return summary
+        settled = end < date.today() - timedelta(days=WEATHER_CACHE_SETTLED_DAYS)
+        _weather_cache.set(_weather_cache_key(args), summary, expire=None if settled else WEATHER_CACHE_RECENT_TTL_SECONDS)
+        if etag and not settled:
+            # Kept past the TTL so an expired recent range can be revalidated instead of re-downloaded
+            _weather_cache.set(("etag",) + _weather_cache_key(args), (etag, summary))
+    return summary
+
+
+def _conditional_headers(args: _ToolArgs) -> tuple:
+    """The stored (etag, summary) for this request, if any, and the headers to revalidate it."""
+    validator = _weather_cache.get(("etag",) + _weather_cache_key(args))
+    return validator, {"If-None-Match": validator[0]} if validator else {}
+
+
+def run_tool(config: UserParameters, args: ToolParameters) -> Any:
+    """
+    Main tool code logic. Retrieves historical weather data from Open-Meteo.com
+    for the specified bounding box and date range.
+    """
+    return _run(_ToolArgs.from_parameters(args))
+
+
+def _run(args: _ToolArgs) -> Any:
+    """run_tool on plain arguments; callers inside this module skip building a Pydantic model."""
+    if len(args.bounding_box) != 4:
+        return {"error": "Bounding box must contain exactly 4 float values: [south_lat, west_lon, north_lat, east_lon]."}
+
+    cached_summary = _weather_cache.get(_weather_cache_key(args))
+    if cached_summary is not None:
+        return cached_summary
+
+    validator, headers = _conditional_headers(args)
     try:
-        response = requests.get(base_url, params=params)
+        response = _SESSION.get(BASE_URL, params=request_params(args), headers=headers, timeout=HTTP_TIMEOUT)
+        if response.status_code == 304 and validator:
+            return _cache_summary(args, validator[1])
         response.raise_for_status()
-        data = response.json()
-
-        if "daily" not in data:
-            return {"error": f"No daily weather data found for the given parameters. Response: {data}"}
-
-        # Extract weather data
-        daily_data = data["daily"]
-        weather_summary = []
-        for i in range(len(daily_data.get("time", []))):
-            summary = {
-                "date": daily_data["time"][i],
-                "temperature_mean_2m": daily_data.get("temperature_2m_mean", ["N/A"])[i],
-                "temperature_max_2m": daily_data.get("temperature_2m_max", ["N/A"])[i],
-                "temperature_min_2m": daily_data.get("temperature_2m_min", ["N/A"])[i],
-                "precipitation_sum": daily_data.get("precipitation_sum", ["N/A"])[i],
-                "wind_speed_10m_mean": daily_data.get("wind_speed_10m_mean", ["N/A"])[i],
-                "relative_humidity_2m_mean": daily_data.get("relative_humidity_2m_mean", ["N/A"])[i],
-            }
-            weather_summary.append(summary)
-
-        return weather_summary
+        return _cache_summary(args, summary_from_response(orjson.loads(response.content)), response.headers.get("ETag"))
     except requests.exceptions.RequestException as e:
         return {"error": f"HTTP error occurred: {e}"}
     except Exception as e:
         return {"error": f"An unexpected error occurred: {e}"}
 
 
+async def run_tool_async(config: UserParameters, args: ToolParameters, client: "httpx.AsyncClient") -> Any:
+    """Async variant of run_tool over a shared (HTTP/2) httpx client; same return shape."""
+    import httpx
+
+    args = _ToolArgs.from_parameters(args)
+    if len(args.bounding_box) != 4:
+        return {"error": "Bounding box must contain exactly 4 float values: [south_lat, west_lon, north_lat, east_lon]."}
+
+    cached_summary = _weather_cache.get(_weather_cache_key(args))
+    if cached_summary is not None:
+        return cached_summary
+
+    validator, headers = _conditional_headers(args)
+    try:
+        response = await client.get(BASE_URL, params=request_params(args), headers=headers)
+        if response.status_code == 304 and validator:
+            return _cache_summary(args, validator[1])
+        response.raise_for_status()
+        return _cache_summary(args, summary_from_response(orjson.loads(response.content)), response.headers.get("ETag"))
+    except httpx.HTTPError as e:
+        return {"error": f"HTTP error occurred: {e}"}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {e}"}
+
+
+def run_tool_many(config: UserParameters, args_list: List[ToolParameters]) -> List[Any]:
+    """Run several weather queries concurrently over one multiplexed HTTP/2 connection, in order."""
+    import httpx
+
+    async def gather():
+        async with httpx.AsyncClient(http2=True, timeout=httpx.Timeout(HTTP_TIMEOUT[1], connect=HTTP_TIMEOUT[0])) as client:
+            return await asyncio.gather(*[run_tool_async(config, args, client) for args in args_list])
+    return list(asyncio.run(gather()))
+
+
+def run_tool_batch(config: UserParameters, bounding_boxes: List[List[float]], start_date: str, end_date: str) -> List[Any]:
+    """
+    Retrieves historical weather for several bounding boxes with a single Open-Meteo request.
+
+    Open-Meteo accepts comma-separated latitude/longitude lists and answers with one result per
+    coordinate, in order. Results are returned in the order of `bounding_boxes`, each shaped like
+    the output of run_tool. Boxes already in the weather cache are answered from it and left out
+    of the request; any box missing from the batch answer falls back to run_tool. A malformed box
+    gets run_tool's error in its slot and the other boxes are still fetched.
+    """
+    if not bounding_boxes:
+        return []
+
+    args_list = [_ToolArgs(tuple(bbox), start_date, end_date) for bbox in bounding_boxes]
+    weather = [
+        _weather_cache.get(_weather_cache_key(args)) if len(args.bounding_box) == 4
+        else {"error": "Bounding box must contain exactly 4 float values: [south_lat, west_lon, north_lat, east_lon]."}
+        for args in args_list
+    ]
+    missing = [i for i, summary in enumerate(weather) if summary is None]
+    if not missing:
+        return weather
+
+    centers = [bounding_box_center(args_list[i].bounding_box) for i in missing]
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in centers),
+        "longitude": ",".join(str(lon) for _, lon in centers),
+        "start_date": start_date,
+        "end_date": end_date,
+        "daily": DAILY_VARIABLES,
+        "timezone": "auto",
+    }
+
+    try:
+        response = _SESSION.get(BASE_URL, params=params, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+        print(f"Batch weather request failed, falling back to per-location requests: {e}")
+        data = []
+
+    # A single coordinate comes back as a bare object rather than a list
+    results = data if isinstance(data, list) else [data]
+    if len(results) != len(missing):
+        results = [{}] * len(missing)
+
+    for i, result in zip(missing, results):
+        if "daily" in result:
+            weather[i] = _cache_summary(args_list[i], summarize_daily(result["daily"]))
+        else:
+            weather[i] = _run(args_list[i])
+    return weather
+
 OUTPUT_KEY = "tool_output"
 
 if __name__ == "__main__":
@@ -108,8 +295,8 @@ if __name__ == "__main__":
     user_dict = json.loads(args.user_params)
     tool_dict = json.loads(args.tool_params)
 
-    config = UserParameters(**user_dict)
-    params = ToolParameters(**tool_dict)
+    config = _USER_ADAPTER.validate_python(user_dict)
+    params = _TOOL_ADAPTER.validate_python(tool_dict)
 
     output = run_tool(config, params)
-    print(OUTPUT_KEY, json.dumps(output))
+    print(OUTPUT_KEY, orjson.dumps(output).decode())
@@ -43,7 +43,7 @@ class AirQualityAnalysisCrew:
         return {
             "input_parser_tool": InputParserTool(),
             "bounding_box_extractor_tool": BoundingBoxExtractorTool(),
-            "air_quality_tool": AirQualityAnalysisTool(),
+            "air_quality_tool": AirQualityAnalysisTool(summary_output=True),
             "weather_tool": HistoricalWeatherTool(),
         }
 
@@ -112,25 +112,27 @@ class AirQualityAnalysisCrew:
             ),
         )
         get_bounding_boxes_task = Task(
-            description="For each of the following locations, use the 'bounding_box_extractor' tool to find their bounding box coordinates. Return the bounding boxes associated with each location.",
+            description="Call the 'bounding_box_extractor' tool ONCE with the full list of parsed locations to find their bounding box coordinates. Return the bounding boxes associated with each location.",
             agent=self.agents["bounding_box_retriever"],
             expected_output="A dictionary or list containing the bounding box coordinates (south, west, north, east) for each specified location.",
             context=[parse_user_input_task],
         )
         get_weather_data_task = Task(
-            description="For each of the following locations, use the bounding boxes (south, west, north, east), and the start_date and end_date in the context,  to query the weather tool to find a concise summary of relevant historical weather conditions between provided  start_date and end_date. Focus on key weather aspects that might influence air quality (e.g., temperature, wind, precipitation).",
+            description="Call the weather tool ONCE with the bounding boxes (south, west, north, east) of all locations, and the start_date and end_date in the context, to find a concise summary of relevant historical weather conditions between provided  start_date and end_date. Focus on key weather aspects that might influence air quality (e.g., temperature, wind, precipitation).",
             agent=self.agents["weather_data_integrator"],
             expected_output="A dictionary or list containing aggregate of historical weather conditions for each specified location.",
             context=[parse_user_input_task, get_bounding_boxes_task],
+            async_execution=True,  # Weather and air quality retrieval run concurrently
         )
         get_air_quality_data_task = Task(
-            description="Fetch air quality data using the air_quality_tool for the eacj location: from start_date to end_date ONLY using the bounding boxes for each location. If specific parameters are provided by the aq_parameters attribute, focus on those. Return the data as a pandas DataFrame.",
+            description="Fetch air quality data by calling the air_quality_tool ONCE with all locations and their bounding boxes, from start_date to end_date ONLY. If specific parameters are provided by the aq_parameters attribute, focus on those. Return the JSON summary returned by the tool exactly as is.",
             agent=self.agents["air_quality_retriever"],
-            expected_output="A pandas DataFrame containing the air quality data for the specified locations, dates, and parameters.",
+            expected_output="The compact JSON air quality summary from the tool: per location and parameter, the units, period mean and max, and daily [mean, max] values keyed by date.",
             context=[parse_user_input_task, get_bounding_boxes_task],
+            async_execution=True,
         )
         analysis_task = Task(
-            description="Analyze the provided air quality data (including parameters like pm10, value, units, date, and location) for the specified locations and dates. Consider the historical weather information (temperature, wind, precipitation, humidity) for the same period. Identify any trends in air quality, calculate average values where relevant, and discuss any potential correlations or influences of weather conditions on the air quality. Provide a detailed report summarizing the air quality situation for each location, including the key findings and any notable observations related to weather patterns. Include facts and observations to compare the provided locations, as well as your own reliable knowledge base sources to comment on the overall Airquality",
+            description="Analyze the provided air quality data (a JSON summary per location and parameter such as pm10, with units, period mean and max, and daily [mean, max] pairs keyed by date) for the specified locations and dates. Consider the historical weather information (temperature, wind, precipitation, humidity) for the same period. Identify any trends in air quality, calculate average values where relevant, and discuss any potential correlations or influences of weather conditions on the air quality. Provide a detailed report summarizing the air quality situation for each location, including the key findings and any notable observations related to weather patterns. Include facts and observations to compare the provided locations, as well as your own reliable knowledge base sources to comment on the overall Airquality",
             agent=self.agents["air_quality_analyst"],
             expected_output="A comprehensive report detailing the air quality analysis for each location, including trends, averages, and a discussion of potential relationships with the historical weather conditions. Include a Summary at the top and Conclusion at the end",
             context=[get_air_quality_data_task, get_weather_data_task],
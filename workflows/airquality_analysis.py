@@ -1,128 +1,534 @@
 import os
-from typing import List, Optional
+import json
+import asyncio
+import hashlib
+import queue
+import string
+import threading
+import httpx
+import litellm
+import requests
+import diskcache
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from crewai import LLM, Crew, Agent, Task
-from agent_tools.bounding_box_extractor_tool import BoundingBoxExtractorTool
-from agent_tools.air_quality_analysis_tool import AirQualityAnalysisTool
-from agent_tools.weather_tools import HistoricalWeatherTool # Assuming weather_tools.py contains HistoricalWeatherTool
-from agent_tools.utils import get_openai_api_key, get_serper_api_key # Import specific functions you use
+from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+from agent_tools.bounding_box_extractor_tool import BoundingBoxExtractorTool, lookup_bounding_boxes
+from agent_tools.air_quality_analysis_tool import AirQualityAnalysisTool, OPENAQ_CACHE_MIN_AGE_DAYS
+from agent_tools.weather_tools import HistoricalWeatherTool, fetch_weather, fetch_weather_batch # Assuming weather_tools.py contains HistoricalWeatherTool
+from agent_tools.utils import get_openai_api_key, get_serper_api_key, dedupe_locations # Import specific functions you use
 MODEL_NAME=os.getenv("MODEL_NAME", "openai/gpt-4o-mini")
+# Per-role models (any LiteLLM provider/model_name). The retrieval agents only pick tool arguments,
+# so a smaller model is enough there; the analyst can run on a local quantized model such as
+# "ollama/llama3.1:8b-instruct-q4_K_M", with MODEL_NAME as the fallback for unusable reports.
+RETRIEVAL_MODEL_NAME = os.getenv("RETRIEVAL_MODEL_NAME", MODEL_NAME)
+ANALYST_MODEL_NAME = os.getenv("ANALYST_MODEL_NAME", MODEL_NAME)
+LLM_TEMPERATURE = 0.7
 # LLM Configuration
-llm = LLM(
-    model=MODEL_NAME,  # call model by provider/model_name
-    temperature=0.7,  # Slightly lower temperature for more focused analysis
+ANALYST_LLM_SETTINGS = dict(
+    model=ANALYST_MODEL_NAME,  # call model by provider/model_name
+    temperature=LLM_TEMPERATURE,  # Slightly lower temperature for more focused analysis
     max_tokens=1000,  # Increased max tokens for a more comprehensive report
     top_p=0.9,
     frequency_penalty=0.1,
     presence_penalty=0.1,
     stop=["END"],
-    seed=42
+    seed=42,
 )
+# Tokens are published as LLMStreamChunkEvents; see stream_air_quality_analysis
+llm = LLM(**ANALYST_LLM_SETTINGS, stream=True)
 
+LLM_BY_ROLE = {
+    "retrieval": LLM(model=RETRIEVAL_MODEL_NAME),
+    "analyst": llm,
+    # Only used by the direct path, when the analyst runs on a model other than MODEL_NAME. The
+    # analyst's report is then checked before it is used, so that call does not stream; only the
+    # fallback does, and a stream never carries a rejected report.
+    "analyst_checked": LLM(**ANALYST_LLM_SETTINGS) if ANALYST_MODEL_NAME != MODEL_NAME else None,
+    "analyst_fallback": LLM(**{**ANALYST_LLM_SETTINGS, "model": MODEL_NAME}, stream=True) if ANALYST_MODEL_NAME != MODEL_NAME else None,
+}
 
-# Load API Keys (ensure these are set as environment variables or securely managed)
-openai_api_key = os.environ.get("OPENAI_API_KEY")
 
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set.")
+# LiteLLM builds (and caches) the OpenAI client behind every LLM above; give them all one pooled
+# HTTP/2 transport so concurrent calls (parallel samples, batch crews) share warm connections.
+# The per-request timeout still comes from the OpenAI client.
+LLM_HTTP_MAX_CONNECTIONS = 64
+if litellm.client_session is None:
+    litellm.client_session = httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=LLM_HTTP_MAX_CONNECTIONS, max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS),
+        timeout=httpx.Timeout(600.0, connect=10.0),
+    )
+
+
+# Stream chunk queues by the ident of the thread running the analysis. The event bus calls
+# handlers synchronously in the thread making the LLM call, so each chunk goes only to the
+# stream that thread belongs to, even with several analyses running concurrently.
+_stream_queues = {}
+_stream_lock = threading.Lock()
+
+
+@crewai_event_bus.on(LLMStreamChunkEvent)
+def _forward_stream_chunk(source, event: LLMStreamChunkEvent) -> None:
+    with _stream_lock:
+        chunks = _stream_queues.get(threading.get_ident())
+    if chunks is not None:
+        chunks.put(event.chunk)
+
+
+# Load API Keys (ensure these are set as environment variables or securely managed).
+# Checked when an analysis runs rather than at import, and only until it first succeeds.
+@lru_cache(maxsize=None)
+def _require_openai_api_key() -> None:
+    if not get_openai_api_key():
+        raise ValueError("OPENAI_API_KEY environment variable not set.")
 
 # Initialize Tools
 bounding_box_extractor_tool = BoundingBoxExtractorTool()
-air_quality_tool = AirQualityAnalysisTool()
+air_quality_tool = AirQualityAnalysisTool(summary_output=True)
 weather_tool = HistoricalWeatherTool()
 
+# The agents are built once per process and reused by every crew; only the tasks carry the
+# per-call locations and dates. CrewAI keeps per-run executor state on the agent, so every run
+# works on copies (Crew.copy() and kickoff_for_each clone the agents).
 
+# Agent 1: Bounding Box Retriever
+_BBOX_AGENT = Agent(
+    role="Geospatial Data Specialist",
+    goal="Retrieve bounding box coordinates for the specified locations.",
+    backstory="Expert in geographical information retrieval and spatial data analysis.",
+    verbose=True,
+    allow_delegation=False,
+    tools=[bounding_box_extractor_tool],
+    llm=LLM_BY_ROLE["retrieval"],
+)
 
-def create_air_quality_analysis_crew(locations: List[str], start_date: str, end_date: str, aq_parameters: Optional[List[str]] = None):
-    """Creates and runs the air quality analysis crew."""
+# Agent 2: Weather Data Integrator
+_WEATHER_AGENT = Agent(
+    role="Historical Weather Data Specialist",
+    goal="Retrieve concise historical weather summaries for the specified locations and dates.",
+    backstory="Expert in accessing and summarizing historical meteorological data relevant to environmental analysis.",
+    verbose=True,
+    allow_delegation=False,
+    tools=[weather_tool],
+    llm=LLM_BY_ROLE["retrieval"],
+)
 
-    # Agent 1: Bounding Box Retriever
-    bounding_box_retriever = Agent(
-        role="Geospatial Data Specialist",
-        goal="Retrieve bounding box coordinates for the specified locations.",
-        backstory="Expert in geographical information retrieval and spatial data analysis.",
-        verbose=True,
-        allow_delegation=False,
-        tools=[bounding_box_extractor_tool],
-    )
+# Agent 3: Air Quality Data Retriever
+_AQ_AGENT = Agent(
+    role="Air Quality Data Retriever",
+    goal="Fetch air quality data from OpenAQ for the specified locations and date range.",
+    backstory="Specialized in accessing and retrieving air quality data from the OpenAQ database.",
+    verbose=True,
+    allow_delegation=False,
+    tools=[air_quality_tool],
+    llm=LLM_BY_ROLE["retrieval"],
+)
+
+# Agent 4: Air Quality Analyst
+_ANALYST_AGENT = Agent(
+    role="Air Quality Analyst",
+    goal="Analyze the collected air quality data and the corresponding weather information to generate a comprehensive report on the air quality situation.",
+    backstory="Experienced environmental scientist specializing in air pollution analysis and its relationship with meteorological conditions.",
+    verbose=True,
+    allow_delegation=False,
+    llm=LLM_BY_ROLE["analyst"],  # Use the configured LLM
+)
+
+PREFETCH_MAX_WORKERS = 8
+
+# Final reports keyed on everything that shapes the prompt. With seed=42 the LLM is close to
+# deterministic, so a rerun of the same analysis is answered without spending any tokens.
+REPORT_CACHE_DIR = os.path.expanduser(os.getenv("AIRAWARE_REPORT_CACHE_DIR", "~/.airaware/reportcache"))
+REPORT_CACHE_RECENT_TTL_SECONDS = 3600  # Windows that may still be back-filled upstream
+_report_cache = diskcache.Cache(REPORT_CACHE_DIR)
+
+
+def _report_cache_key(locations: List[str], start_date: str, end_date: str, aq_parameters: Optional[List[str]]) -> str:
+    inputs = [[" ".join(location.split()).lower() for location in locations], start_date, end_date, sorted(aq_parameters or []), ANALYST_MODEL_NAME, LLM_TEMPERATURE]
+    return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+
+# The analyst's instructions, shared by the crew's analysis task and the direct (agent-free) path
+ANALYSIS_TASK_DESCRIPTION = "Analyze the provided air quality data (a JSON summary per location and parameter such as pm10, with units, period mean and max, and daily [mean, max] pairs keyed by date) for the specified locations and dates. Consider the historical weather information (temperature, wind, precipitation, humidity) for the same period. Identify any trends in air quality, calculate average values where relevant, and discuss any potential correlations or influences of weather conditions on the air quality. Provide a detailed report summarizing the air quality situation for each city, including the key findings and any notable observations related to weather patterns."
+ANALYSIS_TASK_EXPECTED_OUTPUT = "A comprehensive report detailing the air quality analysis for each city, including trends, averages, and a discussion of potential relationships with the historical weather conditions."
+
+# Retrieval task texts, parsed once at import. Locations are rendered one per line rather than as
+# a Python list repr, which keeps long location lists compact in the prompt.
+BBOX_TASK_TEMPLATE = string.Template("Call the 'bounding_box_extractor' tool ONCE with the full list of locations below to find their bounding box coordinates. Return the bounding boxes associated with each location.\nLocations:\n$locations")
+WEATHER_TASK_TEMPLATE = string.Template("Call the weather tool ONCE with the bounding boxes (south, west, north, east) of all of the following locations to get their daily historical weather between $start_date and $end_date. Return the JSON returned by the tool exactly as is.\nLocations:\n$locations")
+AQ_TASK_TEMPLATE = string.Template("Fetch air quality data by calling the air_quality_tool ONCE with the full list of locations below and their bounding boxes, from $start_date to $end_date. If specific parameters are provided ($aq_parameters), focus on those. Return the JSON summary returned by the tool exactly as is.\nLocations:\n$locations")
 
+# latency_priority: the analyst report is sampled this many times in parallel and the first
+# acceptable one wins, trading extra tokens on the analysis call for a shorter tail
+ANALYST_SAMPLES = 3
+BATCH_MAX_CONCURRENCY = 4  # Analyses in flight at once in create_air_quality_analysis_crew_batch
+
+
+def prefetch_location_data(locations: List[str], start_date: str, end_date: str, include_weather: bool = True, include_air_quality: bool = False, aq_parameters: Optional[List[str]] = None) -> dict:
+    """
+    Resolve bounding boxes (and optionally weather and air quality) for all locations concurrently.
+
+    The calls are I/O bound, so a thread pool overlaps their network latency; Nominatim's
+    1 request/s limit is enforced inside the bounding box tool. Geocoding results are memoised
+    there, so the agents' own tool calls for these locations are answered from memory.
+    Weather and air quality only need the bounding boxes, so once those are known both are
+    fetched at the same time: the total is geocoding + max(weather, air quality).
+
+    Returns:
+        dict: location -> {"bounding_box": ..., "weather": ..., "air_quality": ...}; tool errors
+        are kept as strings, and locations without air quality data have no "air_quality" entry.
+    """
+    if not locations:
+        return {}
+    # One extra worker for the air quality fetch, so it never queues behind the weather fallback
+    with ThreadPoolExecutor(max_workers=min(PREFETCH_MAX_WORKERS, len(locations)) + include_air_quality) as executor:
+        bboxes = lookup_bounding_boxes(locations, executor=executor)
+        results = {location: {"bounding_box": bbox} for location, bbox in zip(locations, bboxes)}
+        located = [(location, bbox) for location, bbox in zip(locations, bboxes) if isinstance(bbox, list)]
+        if include_air_quality and located:
+            air_quality_future = executor.submit(
+                air_quality_tool._run, [bbox for _, bbox in located], [location for location, _ in located], start_date, end_date, aq_parameters
+            )
+        if include_weather:
+            # One multi-coordinate Open-Meteo request for every location; per-location calls only as a fallback
+            try:
+                weather = fetch_weather_batch([bbox for _, bbox in located], start_date, end_date)
+            except (requests.exceptions.RequestException, ValueError) as e:  # ValueError: malformed JSON
+                print(f"Batch weather request failed, falling back to per-location requests: {e}")
+                weather = [None] * len(located)
+            missing = [i for i, summary in enumerate(weather) if summary is None]
+            for i, summary in zip(missing, executor.map(lambda i: fetch_weather(located[i][1], start_date, end_date), missing)):
+                weather[i] = summary
+            for (location, _), summary in zip(located, weather):
+                results[location]["weather"] = summary
+        if include_air_quality and located:
+            for location, summary in json.loads(air_quality_future.result()).items():
+                results[location]["air_quality"] = summary
+    return results
+
+
+def _is_acceptable_report(report: str, locations: List[str]) -> bool:
+    # Cheap sanity check: the report must cover every location (by the name before any comma)
+    text = report.lower()
+    return bool(text.strip()) and all(location.split(",")[0].strip().lower() in text for location in locations)
+
+
+def _analyst_messages(context: List[str]) -> List[dict]:
+    # The analyst's role and the analysis task as chat messages, for calling the LLM without a crew
+    return [
+        {"role": "system", "content": f"You are {_ANALYST_AGENT.role}. {_ANALYST_AGENT.backstory}\nYour personal goal is: {_ANALYST_AGENT.goal}"},
+        {"role": "user", "content": f"{ANALYSIS_TASK_DESCRIPTION}\n\nThis is the expected criteria for your final answer: {ANALYSIS_TASK_EXPECTED_OUTPUT}\n\nContext:\n" + "\n\n".join(context)},
+    ]
+
+
+def _first_acceptable_analysis(messages: List[dict], locations: List[str], samples: int) -> str:
+    """
+    Generate the analyst report with several seeds concurrently and return the first
+    completion that passes _is_acceptable_report. If none does, the last one to finish
+    is returned. Completions still running are abandoned, not awaited.
+    """
+    # Non-streaming copies: parallel samples must not interleave chunks into a report stream
+    sample_llms = [LLM(**{**ANALYST_LLM_SETTINGS, "seed": ANALYST_LLM_SETTINGS["seed"] + i}) for i in range(samples)]
+    executor = ThreadPoolExecutor(max_workers=samples, thread_name_prefix="analyst-sample")
+    pending = {executor.submit(sample_llm.call, messages) for sample_llm in sample_llms}
+    report, errors = None, []
+    try:
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                report = future.result()
+                if _is_acceptable_report(report, locations):
+                    return report
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    if report is None:
+        raise errors[0]
+    return report
+
+
+def _task_inputs(locations: List[str], start_date: str, end_date: str, aq_parameters: Optional[List[str]]) -> dict:
+    # The values substituted into the retrieval task templates
+    return {
+        "locations": "\n".join(locations),
+        "start_date": start_date,
+        "end_date": end_date,
+        "aq_parameters": ", ".join(aq_parameters) if aq_parameters else "none",
+    }
+
+
+def _build_tasks(inputs: dict) -> Tuple[Task, Task, Task, Task]:
+    """
+    Build the four per-run tasks from _task_inputs(...). The values are only substituted into
+    the task texts, so "{placeholder}" values produce templates for kickoff(inputs=...).
+    """
     # Task 1: Get Bounding Boxes
     get_bounding_boxes_task = Task(
-        description=f"For each of the following locations: {locations}, use the 'bounding_box_extractor' tool to find their bounding box coordinates. Return the bounding boxes associated with each location.",
-        agent=bounding_box_retriever,
+        description=BBOX_TASK_TEMPLATE.substitute(inputs),
+        agent=_BBOX_AGENT,
         expected_output="A dictionary or list containing the bounding box coordinates (south, west, north, east) for each specified location.",
     )
 
-    # Agent 2: Weather Data Integrator
-    weather_data_integrator = Agent(
-        role="Historical Weather Data Specialist",
-        goal="Retrieve concise historical weather summaries for the specified locations and dates.",
-        backstory="Expert in accessing and summarizing historical meteorological data relevant to environmental analysis.",
-        verbose=True,
-        allow_delegation=False,
-        tools=[weather_tool],
-    )
-
     # Task 2: Get Weather Data
     get_weather_data_task = Task(
-        description=f"For each of the following locations: {locations}, use the bounding boxes (south, west, north, east) to query the weather tool to find a concise summary of relevant historical weather conditions between {start_date} and {end_date}. Focus on key weather aspects that might influence air quality (e.g., temperature, wind, precipitation).",
-        agent=weather_data_integrator,
-        expected_output="A dictionary or list containing concise summaries of historical weather conditions for each specified city.",
-        context=[get_bounding_boxes_task], 
+        description=WEATHER_TASK_TEMPLATE.substitute(inputs),
+        agent=_WEATHER_AGENT,
+        expected_output="The JSON returned by the weather tool: the daily weather records (temperature, precipitation, wind, humidity) keyed by location.",
+        context=[get_bounding_boxes_task],
+        async_execution=True,  # Runs alongside the air quality task; both only need the bounding boxes
     )
 
-    # Agent 3: Air Quality Data Retriever
-    air_quality_retriever = Agent(
-        role="Air Quality Data Retriever",
-        goal="Fetch air quality data from OpenAQ for the specified locations and date range.",
-        backstory="Specialized in accessing and retrieving air quality data from the OpenAQ database.",
-        verbose=True,
-        allow_delegation=False,
-        tools=[air_quality_tool],
-    )
-    
     # Task 3: Get Air Quality Data
     get_air_quality_data_task = Task(
-        description=f"Fetch air quality data using the air_quality_tool for the following locations: {locations} from {start_date} to {end_date} using the bounding boxes for each location. If specific parameters are provided ({aq_parameters}), focus on those. Return the data as a pandas DataFrame.",
-        agent=air_quality_retriever,
-        expected_output="A pandas DataFrame containing the air quality data for the specified locations, dates, and parameters.",
+        description=AQ_TASK_TEMPLATE.substitute(inputs),
+        agent=_AQ_AGENT,
+        expected_output="The compact JSON air quality summary from the tool: per location and parameter, the units, period mean and max, and daily [mean, max] values keyed by date.",
         context=[get_bounding_boxes_task],  # The AirQualityAnalysisTool needs the locations
-    )
-
-    # Agent 4: Air Quality Analyst
-    air_quality_analyst = Agent(
-        role="Air Quality Analyst",
-        goal="Analyze the collected air quality data and the corresponding weather information to generate a comprehensive report on the air quality situation.",
-        backstory="Experienced environmental scientist specializing in air pollution analysis and its relationship with meteorological conditions.",
-        verbose=True,
-        allow_delegation=False,
-        llm=llm,  # Use the configured LLM
-        context=[get_air_quality_data_task] + [get_weather_data_task],
+        async_execution=True,
     )
 
     # Task 4: Analyze and Report
     analysis_task = Task(
-        description="Analyze the provided air quality data (including parameters like pm10, value, units, date, and location) for the specified locations and dates. Consider the historical weather information (temperature, wind, precipitation, humidity) for the same period. Identify any trends in air quality, calculate average values where relevant, and discuss any potential correlations or influences of weather conditions on the air quality. Provide a detailed report summarizing the air quality situation for each city, including the key findings and any notable observations related to weather patterns.",
-        agent=air_quality_analyst,
-        expected_output="A comprehensive report detailing the air quality analysis for each city, including trends, averages, and a discussion of potential relationships with the historical weather conditions.",
+        description=ANALYSIS_TASK_DESCRIPTION,
+        agent=_ANALYST_AGENT,
+        expected_output=ANALYSIS_TASK_EXPECTED_OUTPUT,
+        context=[get_air_quality_data_task, get_weather_data_task],  # Waits for both concurrent retrieval tasks
     )
 
+    return get_bounding_boxes_task, get_weather_data_task, get_air_quality_data_task, analysis_task
 
-    # Instantiate the Crew
-    agents = [bounding_box_retriever, weather_data_integrator, air_quality_retriever, air_quality_analyst]
-    tasks = [get_bounding_boxes_task, get_weather_data_task, get_air_quality_data_task, analysis_task]
 
+def _has_complete_data(locations: List[str], air_quality: dict, weather: dict) -> bool:
+    # Every location needs air quality data and weather records; tool errors are plain strings,
+    # records a JSON list (as text from the tools, parsed when read back from an agent's answer)
+    return all(
+        air_quality.get(location) and (isinstance(records := weather.get(location), list) or (isinstance(records, str) and records.startswith("[")))
+        for location in locations
+    )
+
+
+def _json_object(text: str) -> dict:
+    # The JSON object in an agent's answer, which may be wrapped in prose or a code fence
+    try:
+        parsed = json.loads(text[text.index("{"):text.rindex("}") + 1])
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _crew_data_complete(tasks_output: list, locations: List[str]) -> bool:
+    # tasks_output of a crew built from _build_tasks: bounding boxes, weather, air quality[, analysis]
+    return _has_complete_data(locations, _json_object(tasks_output[2].raw), _json_object(tasks_output[1].raw))
+
+
+def _cache_report(report_cache_key: str, end_date: str, report: str) -> None:
+    # Historical air quality and weather no longer change, so those reports never expire. Only
+    # call this for reports written from complete data, or one outage is cached for good.
+    settled = date.fromisoformat(end_date) <= date.today() - timedelta(days=OPENAQ_CACHE_MIN_AGE_DAYS)
+    _report_cache.set(report_cache_key, report, expire=None if settled else REPORT_CACHE_RECENT_TTL_SECONDS)
+
+
+def _analyze_directly(locations: List[str], start_date: str, end_date: str, aq_parameters: Optional[List[str]], latency_priority: bool, analyst_samples: int) -> Tuple[str, bool]:
+    # Retrieval is deterministic, so the tools are called straight from Python (weather and air
+    # quality concurrently) and the LLM is only used once, for the analyst's report.
+    # Also returns whether the report was written from complete data (see _has_complete_data).
+    data = prefetch_location_data(locations, start_date, end_date, include_air_quality=True, aq_parameters=aq_parameters)
+    air_quality = {location: entry["air_quality"] for location, entry in data.items() if "air_quality" in entry}
+    complete = _has_complete_data(locations, air_quality, {location: entry.get("weather") for location, entry in data.items()})
+    context = [
+        f"Locations: {'; '.join(locations)}; period: {start_date} to {end_date}.",
+        "Air quality summary: " + json.dumps(air_quality, separators=(",", ":"), ensure_ascii=False),
+        "Historical weather per location:\n" + "\n".join(f"{location}: {entry.get('weather', entry['bounding_box'])}" for location, entry in data.items()),
+    ]
+    messages = _analyst_messages(context)
+    if latency_priority and analyst_samples > 1:
+        return _first_acceptable_analysis(messages, locations, analyst_samples), complete
+    fallback_llm = LLM_BY_ROLE["analyst_fallback"]
+    if fallback_llm is None:
+        return LLM_BY_ROLE["analyst"].call(messages), complete
+    try:
+        report = LLM_BY_ROLE["analyst_checked"].call(messages)
+        if _is_acceptable_report(report, locations):
+            return report, complete
+        print(f"Report from {ANALYST_MODEL_NAME} did not cover every location; retrying with {MODEL_NAME}")
+    except Exception as e:
+        print(f"Analyst model {ANALYST_MODEL_NAME} failed, retrying with {MODEL_NAME}: {e}")
+    return fallback_llm.call(messages), complete
+
+
+def create_air_quality_analysis_crew(locations: List[str], start_date: str, end_date: str, aq_parameters: Optional[List[str]] = None, latency_priority: bool = False, analyst_samples: int = ANALYST_SAMPLES, use_agents: bool = False) -> str:
+    """
+    Creates and runs the air quality analysis and returns the report as a string.
+
+    By default the data is retrieved by calling the tools directly and only the analyst
+    report goes through the LLM. With use_agents the full CrewAI crew runs instead, with an
+    agent (and an LLM call) per retrieval step.
+
+    With latency_priority (and analyst_samples > 1) the report is sampled analyst_samples
+    times in parallel and the first acceptable one wins. The data is then always retrieved
+    directly, even with use_agents: a crew runs its tasks one after another around every sync
+    task, so the agents cannot fetch weather and air quality concurrently before the samples.
+    Reports are cached only when every location had data.
+    """
+    locations = dedupe_locations(locations)
+
+    report_cache_key = _report_cache_key(locations, start_date, end_date, aq_parameters)
+    cached_report = _report_cache.get(report_cache_key)
+    if cached_report is not None:
+        print("Returning cached analysis report")
+        return cached_report
+
+    _require_openai_api_key()
+
+    if not use_agents or (latency_priority and analyst_samples > 1):
+        report, complete = _analyze_directly(locations, start_date, end_date, aq_parameters, latency_priority, analyst_samples)
+        if complete:
+            _cache_report(report_cache_key, end_date, report)
+        return report
+
+    # Geocode every location up front in parallel so the retrieval agents hit a warm cache
+    prefetch_location_data(locations, start_date, end_date, include_weather=False)
+
+    get_bounding_boxes_task, get_weather_data_task, get_air_quality_data_task, analysis_task = _build_tasks(_task_inputs(locations, start_date, end_date, aq_parameters))
 
+    # Instantiate the Crew
     crew = Crew(
-        agents=agents,
-        tasks=tasks,
+        agents=[_BBOX_AGENT, _WEATHER_AGENT, _AQ_AGENT, _ANALYST_AGENT],
+        tasks=[get_bounding_boxes_task, get_weather_data_task, get_air_quality_data_task, analysis_task],
         verbose=True,
     )
 
-    # Run the crew and get the analysis report
-    report = crew.kickoff()
+    # Run a copy of the crew (with its own agents) and get the analysis report
+    crew_output = crew.copy().kickoff()
+    report = str(crew_output)
+    if _crew_data_complete(crew_output.tasks_output, locations):
+        _cache_report(report_cache_key, end_date, report)
     return report
 
 
+async def create_air_quality_analysis_crew_async(locations: List[str], start_date: str, end_date: str, aq_parameters: Optional[List[str]] = None, latency_priority: bool = False, analyst_samples: int = ANALYST_SAMPLES, use_agents: bool = False):
+    """
+    Non-blocking create_air_quality_analysis_crew for async callers (e.g. a FastAPI handler).
+
+    Like Crew.kickoff_async, the run happens in a worker thread so the event loop stays free;
+    await several with asyncio.gather(...) to run analyses concurrently; use
+    create_air_quality_analysis_crew_batch to bound the concurrency of many runs.
+    """
+    return await asyncio.to_thread(
+        create_air_quality_analysis_crew, locations, start_date, end_date, aq_parameters,
+        latency_priority=latency_priority, analyst_samples=analyst_samples, use_agents=use_agents,
+    )
+
+
+async def _kickoff_bounded(crew: Crew, inputs: List[dict], max_concurrency: int) -> list:
+    # Same as Crew.kickoff_for_each_async (one crew copy per input, run via kickoff_async),
+    # but with at most max_concurrency crews in flight against the LLM and data APIs
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_crew(crew_copy: Crew, row: dict):
+        async with semaphore:
+            return await crew_copy.kickoff_async(inputs=row)
+
+    return await asyncio.gather(*(run_crew(crew.copy(), row) for row in inputs))
+
+
+def create_air_quality_analysis_crew_batch(inputs: List[dict], max_concurrency: int = BATCH_MAX_CONCURRENCY, use_agents: bool = False) -> list:
+    """
+    Run the air quality analysis for many requests concurrently.
+
+    Args:
+        inputs (list): One dict per analysis with 'locations', 'start_date', 'end_date' and
+            optionally 'aq_parameters' (the arguments of create_air_quality_analysis_crew).
+        max_concurrency (int): Maximum number of analyses running at the same time.
+        use_agents (bool): Run each analysis as a full CrewAI crew instead of calling the
+            tools directly (see create_air_quality_analysis_crew).
+
+    Returns:
+        list: The reports (str), in the order of inputs.
+    """
+    rows = [
+        {
+            "locations": dedupe_locations(row["locations"]),
+            "start_date": row["start_date"],
+            "end_date": row["end_date"],
+            "aq_parameters": row.get("aq_parameters"),
+        }
+        for row in inputs
+    ]
+    cache_keys = [_report_cache_key(**row) for row in rows]
+    reports = [_report_cache.get(cache_key) for cache_key in cache_keys]
+    pending = [i for i, report in enumerate(reports) if report is None]
+    if not pending:
+        return reports
+
+    _require_openai_api_key()
+
+    # Geocode every distinct location of the batch in one parallel pass
+    batch_locations = dedupe_locations([location for i in pending for location in rows[i]["locations"]])
+    with ThreadPoolExecutor(max_workers=min(PREFETCH_MAX_WORKERS, len(batch_locations))) as executor:
+        lookup_bounding_boxes(batch_locations, executor=executor)
+
+    if not use_agents:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(pending))), thread_name_prefix="airquality-batch") as executor:
+            results = list(executor.map(lambda i: _analyze_directly(**rows[i], latency_priority=False, analyst_samples=1), pending))
+    else:
+        # One crew whose task texts are templates; CrewAI fills the placeholders from each input row
+        crew = Crew(
+            agents=[_BBOX_AGENT, _WEATHER_AGENT, _AQ_AGENT, _ANALYST_AGENT],
+            tasks=list(_build_tasks({key: "{" + key + "}" for key in ("locations", "start_date", "end_date", "aq_parameters")})),
+            verbose=True,
+        )
+        crew_outputs = asyncio.run(_kickoff_bounded(crew, [_task_inputs(**rows[i]) for i in pending], max(1, max_concurrency)))
+        results = [(str(crew_output), _crew_data_complete(crew_output.tasks_output, rows[i]["locations"])) for i, crew_output in zip(pending, crew_outputs)]
+    for i, (report, complete) in zip(pending, results):
+        reports[i] = report
+        if complete:
+            _cache_report(cache_keys[i], rows[i]["end_date"], report)
+    return reports
+
+
+def stream_air_quality_analysis(locations: List[str], start_date: str, end_date: str, aq_parameters: Optional[List[str]] = None, use_agents: bool = False) -> Iterator[str]:
+    """
+    Run the air quality analysis crew and yield the analyst's report as it is generated.
+
+    Usage: for chunk in stream_air_quality_analysis(...): print(chunk, end="")
+    A cached report is yielded whole, as is an analyst report that had to pass the check for
+    the fallback model (see LLM_BY_ROLE). Errors from the crew are re-raised once the stream ends.
+    """
+    chunks = queue.Queue()
+    done = object()
+    outcome = {}
+
+    def run_crew():
+        with _stream_lock:
+            _stream_queues[threading.get_ident()] = chunks
+        try:
+            outcome["report"] = create_air_quality_analysis_crew(locations, start_date, end_date, aq_parameters, use_agents=use_agents)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            with _stream_lock:
+                del _stream_queues[threading.get_ident()]
+            chunks.put(done)
+
+    worker = threading.Thread(target=run_crew, name="airquality-crew", daemon=True)
+    worker.start()
+    streamed = False
+    while (chunk := chunks.get()) is not done:
+        streamed = True
+        yield chunk
+    worker.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    if not streamed:
+        yield str(outcome["report"])
+
+
 # For Testing just the workflow
 # if __name__ == "__main__":
 #     locations = ["New Delhi, India", "Chennai, India"]